@@ -0,0 +1,206 @@
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+
+import numpy as np
+import pandas as pd
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+for package in ['eda', 'data', 'ml', 'utils']:
+    path = os.path.join(BENCHMARK_DIR, package)
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+import cacheutil
+import dataingest
+import datastats
+import datapipeline
+import dataprocessview
+import datainfer
+import edaplotdata
+import edacustomplot
+import maputil
+import mlsupervised
+
+BENCHMARK_SIZES = [10000, 100000, 1000000]
+BENCHMARK_SHAPES = ['narrow', 'wide']
+BENCHMARK_REPEAT = 3
+BENCHMARK_THRESHOLD = 0.2
+# 70% of it trained, past mlsolver.SCALABLE_MIN_ROWS: the largest size times the SGD engine
+BENCHMARK_TRAIN_MAX_ROWS = 150000
+BENCHMARK_RANDOM_STATE = 42
+BENCHMARK_BASELINE = 'benchmark_baseline.json'
+
+SHAPE_COLUMNS = {
+    'narrow': (4, 2),
+    'wide': (100, 10),
+}
+
+
+def make_dataset(n_rows, shape, random_state=BENCHMARK_RANDOM_STATE):
+    rng = np.random.RandomState(random_state)
+    n_numeric, n_categorical = SHAPE_COLUMNS[shape]
+    columns = {f'num_{i}': rng.normal(i, 1 + i % 3, n_rows) for i in range(n_numeric)}
+    for i in range(n_categorical):
+        levels = np.array([f'level_{j}' for j in range(5 * 10 ** (i % 3))])
+        columns[f'cat_{i}'] = levels[rng.zipf(1.5, n_rows) % len(levels)]
+    columns['lat'] = rng.normal(40.7, 0.05, n_rows)
+    columns['lon'] = rng.normal(-74.0, 0.05, n_rows)
+    columns['label'] = (columns['num_0'] + rng.normal(0, 1, n_rows) > 0).astype(np.int64)
+    df = pd.DataFrame(columns)
+    df.loc[rng.random_sample(n_rows) < 0.01, 'num_1'] = np.nan
+    return df
+
+
+def measure(func, repeat=BENCHMARK_REPEAT):
+    # best of repeat, the least noisy estimate of the cost itself
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def run_ingestion(path):
+    return dataingest.load_data_chunked(path)
+
+
+def run_processing(df):
+    cat_col = [col for col in df.columns if col.startswith('cat_')]
+    steps = dataprocessview.get_process_steps(
+        list(df.columns),
+        {col: {'type': datainfer.TYPE_CATEGORY} for col in cat_col[1:]},
+        [dataprocessview.LABEL_DROP_NULL_VALUES],
+        {'encoder_type': dataprocessview.ENCODER_TYPE_ONE_HOT, 'columns': cat_col[:1]})
+    # a private cache, so every repeat does the work instead of hitting the memo
+    return datapipeline.run_pipeline(df, steps, cache=cacheutil.LRUCache(0))
+
+
+def run_stats(df):
+    stats, null_counts = datastats.get_frame_stats(df)
+    return stats.get_cov(), stats.get_corr(), stats.get_skew(), stats.get_describe()
+
+
+def run_plot_data(df):
+    num_col = [col for col in df.columns if col.startswith('num_')][:4]
+    histograms = [edaplotdata.get_histogram(df[col]) for col in num_col]
+    sample = edaplotdata.sample_rows(df, edaplotdata.PLOT_POINT_BUDGET, 'cat_0')
+    swarm = edaplotdata.get_swarm_sample(df, 'cat_0')
+    return histograms, sample, swarm
+
+
+def run_plot_render(df):
+    for plot_type, x, y in [(edacustomplot.PLOT_TYPE_HISTOGRAM, 'num_0', None), (edacustomplot.PLOT_TYPE_BOX, 'cat_0', 'num_0'),
+            (edacustomplot.PLOT_TYPE_SCATTER, 'num_0', 'num_1')]:
+        ax = edacustomplot.make_plot(df, plot_type, x, y)
+        ax.get_figure().savefig(os.devnull, format='png')
+        plt.close('all')
+
+
+def run_map_data(df):
+    maputil.map_cache.clear()
+    data, (lat, lon, zoom) = maputil.get_map_data(df, 'lat', 'lon')
+    size = maputil.get_bin_size(100, lat, zoom)
+    return maputil.bin_points(data['lat'], data['lon'], size, maputil.BINNING_HEXAGON, center=(lat, lon))
+
+
+def run_training(df, algo_type):
+    df = df.dropna().iloc[:BENCHMARK_TRAIN_MAX_ROWS]
+    feature_columns = [col for col in df.columns if col.startswith('num_')]
+    # no seed, so the model registry is bypassed and every repeat fits
+    return mlsupervised.train_model(df, mlsupervised.ML_TYPE_CLASSIFICATION, algo_type, feature_columns, 'label', 70)
+
+
+def get_benchmarks(df, path):
+    return [
+        ('ingestion', lambda: run_ingestion(path)),
+        ('processing', lambda: run_processing(df)),
+        ('stats', lambda: run_stats(df)),
+        ('plot_data', lambda: run_plot_data(df)),
+        ('plot_render', lambda: run_plot_render(df)),
+        ('map_data', lambda: run_map_data(df)),
+        ('train_decision_tree', lambda: run_training(df, mlsupervised.ALGO_DECISION_TREE_CLASSIFIER)),
+        ('train_logistic_regression', lambda: run_training(df, mlsupervised.ALGO_LOGISTIC_REGRESSION)),
+    ]
+
+
+def run_benchmarks(sizes=BENCHMARK_SIZES, shapes=BENCHMARK_SHAPES, names=None, repeat=BENCHMARK_REPEAT, log=print):
+    results = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for shape in shapes:
+            for n_rows in sizes:
+                df = make_dataset(n_rows, shape)
+                path = os.path.join(tmp_dir, f'{shape}-{n_rows}.csv')
+                df.to_csv(path, index=False)
+                for name, func in get_benchmarks(df, path):
+                    if names and name not in names:
+                        continue
+                    seconds = measure(func, repeat)
+                    results.append({'benchmark': name, 'shape': shape, 'rows': n_rows, 'seconds': seconds})
+                    log(f'{name:<28} {shape:<8} {n_rows:>10,} {seconds:10.4f}s')
+    return {
+        'time': time.time(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'processor': platform.processor(),
+        'cpu_count': os.cpu_count(),
+        'results': results,
+    }
+
+
+def get_result_key(result):
+    return result['benchmark'], result['shape'], result['rows']
+
+
+def find_regressions(report, baseline, threshold=BENCHMARK_THRESHOLD):
+    baseline_seconds = {get_result_key(result): result['seconds'] for result in baseline['results']}
+    regressions = []
+    for result in report['results']:
+        before = baseline_seconds.get(get_result_key(result))
+        if before and result['seconds'] > before * (1 + threshold):
+            regressions.append(dict(result, baseline=before, ratio=result['seconds'] / before))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Time the data, EDA and ML code paths on synthetic datasets.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=BENCHMARK_SIZES)
+    parser.add_argument('--shapes', nargs='+', choices=list(SHAPE_COLUMNS), default=BENCHMARK_SHAPES)
+    parser.add_argument('--benchmarks', nargs='+', help='only run these benchmarks')
+    parser.add_argument('--repeat', type=int, default=BENCHMARK_REPEAT)
+    parser.add_argument('--output', help='write the results as JSON')
+    parser.add_argument('--baseline', default=BENCHMARK_BASELINE, help='compare against this results file')
+    parser.add_argument('--save-baseline', action='store_true', help='store the results as the new baseline')
+    parser.add_argument('--threshold', type=float, default=BENCHMARK_THRESHOLD, help='allowed slowdown, 0.2 = 20%%')
+    args = parser.parse_args(argv)
+
+    report = run_benchmarks(args.sizes, args.shapes, args.benchmarks, args.repeat)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+        return 0
+
+    if not os.path.isfile(args.baseline):
+        print(f'No baseline at {args.baseline}, run with --save-baseline to store one')
+        return 0
+    with open(args.baseline) as f:
+        regressions = find_regressions(report, json.load(f), args.threshold)
+    for r in regressions:
+        print(f'REGRESSION {r["benchmark"]} {r["shape"]} {r["rows"]:,}: {r["seconds"]:.4f}s vs {r["baseline"]:.4f}s ({r["ratio"]:.2f}x)')
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
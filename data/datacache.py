@@ -0,0 +1,193 @@
+import os
+import time
+import pickle
+import weakref
+import threading
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+import cacheutil
+import dataremote
+
+CACHE_DIR = os.environ.get('ACTIVEML_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.activeml', 'cache'))
+CACHE_MAX_BYTES = int(os.environ.get('ACTIVEML_CACHE_MAX_BYTES', 4 << 30))
+MEMORY_CACHE_MAX_BYTES = int(os.environ.get('ACTIVEML_MEMORY_CACHE_MAX_BYTES', 1 << 30))
+UPLOAD_HASH_MAX_ENTRIES = 256
+# how long data from a server that sends no ETag or Last-Modified is reused
+UNVERSIONED_MAX_AGE = float(os.environ.get('ACTIVEML_UNVERSIONED_CACHE_SECONDS', 600))
+
+# the block manager flags of mark_consolidated, private to the pinned pandas 1.x;
+# other versions get the plain pandas behavior
+PANDAS_BLOCK_FLAGS = pd.__version__.split('.')[0] == '1'
+
+DATA_EXTENSION = '.arrow'
+META_EXTENSION = '.pkl'
+
+
+def get_entry_size(entry):
+    return cacheutil.get_frame_size(entry[0])
+
+
+# One frame per dataset for the whole process: every session gets the same
+# memory-mapped frame. The LRU keeps recently used ones alive, and the weak
+# references find a frame that was evicted but is still held by a session
+# (or a cache built from it), so it is never mapped and converted twice.
+memory_cache = cacheutil.LRUCache(MEMORY_CACHE_MAX_BYTES, get_entry_size)
+shared_frames = weakref.WeakValueDictionary()
+_lock = threading.Lock()
+# content hashes of uploads by (upload id, name, size): an upload keeps its id
+# across reruns, so it is read through once rather than on every rerun
+upload_hashes = cacheutil.LRUCache(UPLOAD_HASH_MAX_ENTRIES)
+
+
+def get_upload_hash(file):
+    upload_id = getattr(file, 'id', None)
+    if upload_id is None or not hasattr(file, 'getbuffer'):
+        return cacheutil.get_content_hash(file)
+    memo_key = (upload_id, getattr(file, 'name', None), file.getbuffer().nbytes)
+    content_hash = upload_hashes.get(memo_key)
+    if content_hash is None:
+        content_hash = cacheutil.get_content_hash(file)
+        upload_hashes.put(memo_key, content_hash)
+    return content_hash
+
+
+def get_source_hash(file):
+    # remote data is keyed by the version the server reports now, so a changed
+    # file is parsed again; without a version, by the UNVERSIONED_MAX_AGE window,
+    # so a change shows up at the latest when the window ends
+    if dataremote.is_url(file):
+        version = dataremote.get_version(file)
+        if version is None:
+            version = ('age', int(time.time() // UNVERSIONED_MAX_AGE))
+        return cacheutil.get_hash('url', file, version)
+    if isinstance(file, str):
+        return cacheutil.get_content_hash(file) if os.path.isfile(file) else None
+    return get_upload_hash(file)
+
+
+def get_cache_key(file, *args):
+    source_hash = get_source_hash(file)
+    return cacheutil.get_hash(source_hash, *args) if source_hash is not None else None
+
+
+def get_path(key, extension, cache_dir=None):
+    return os.path.join(cache_dir or CACHE_DIR, key + extension)
+
+
+def load(key, with_meta=False, cache_dir=None):
+    if key is None:
+        return None
+    entry = memory_cache.get(key)
+    if entry is None or (with_meta and entry[1] is None):
+        entry = load_file(key, with_meta, cache_dir)
+        if entry is None:
+            return None
+        memory_cache.put(key, entry)
+    return entry if with_meta else entry[0]
+
+
+def load_file(key, with_meta=False, cache_dir=None):
+    data_path = get_path(key, DATA_EXTENSION, cache_dir)
+    meta_path = get_path(key, META_EXTENSION, cache_dir)
+    if not os.path.isfile(data_path) or (with_meta and not os.path.isfile(meta_path)):
+        return None
+    try:
+        data = map_frame(key, cache_dir)
+        if data is None:
+            return None
+        meta = None
+        if with_meta:
+            with open(meta_path, 'rb') as f:
+                meta = pickle.load(f)
+            cacheutil.touch(meta_path)
+        return data, meta
+    except (OSError, pickle.UnpicklingError, EOFError):
+        return None
+
+
+def map_frame(key, cache_dir=None):
+    data_path = get_path(key, DATA_EXTENSION, cache_dir)
+    with _lock:
+        data = shared_frames.get(key)
+        if data is not None:
+            return data
+        try:
+            # uncompressed Arrow IPC files are memory-mapped instead of parsed;
+            # numeric columns without nulls stay in the mapped pages, which the
+            # OS shares between sessions and processes and can drop under pressure
+            table = feather.read_table(data_path, memory_map=True)
+            data = mark_consolidated(table.to_pandas(split_blocks=True, self_destruct=True))
+        except (OSError, pa.ArrowException):
+            return None
+        shared_frames[key] = data
+    cacheutil.touch(data_path)
+    return data
+
+
+def mark_consolidated(df):
+    # pandas 1.x consolidates a frame in place before take, reindex and the
+    # like (df[columns] included), which would copy the mapped single-column
+    # blocks of a shared frame into new 2D blocks for every session. Flagged
+    # as consolidated, the blocks are left as they are.
+    mgr = getattr(df, '_mgr', None)
+    if PANDAS_BLOCK_FLAGS and mgr is not None and hasattr(mgr, '_known_consolidated'):
+        mgr._is_consolidated = True
+        mgr._known_consolidated = True
+    return df
+
+
+def shallow_copy(df):
+    # a shallow copy gets a new block manager, keep the flags of the original
+    copy = df.copy(deep=False)
+    mgr = getattr(df, '_mgr', None)
+    if PANDAS_BLOCK_FLAGS and mgr is not None and getattr(mgr, '_known_consolidated', False) \
+            and getattr(mgr, '_is_consolidated', False):
+        mark_consolidated(copy)
+    return copy
+
+
+def is_shared(df):
+    # mapped frames have one block per column, so dropping columns from a
+    # shallow copy of one copies nothing
+    return any(frame is df for frame in shared_frames.values())
+
+
+def get_shared_stats():
+    frames = list(shared_frames.values())
+    return len(frames), sum(cacheutil.get_frame_size(df) for df in frames)
+
+
+def save(key, data, meta=None, cache_dir=None, max_bytes=None):
+    # Returns what the caller should keep using: the memory-mapped frame once
+    # it is written, so the parsed copy can be freed, or data itself when it
+    # cannot be stored
+    if key is None:
+        return data if meta is None else (data, meta)
+    cache_dir = cache_dir or CACHE_DIR
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        table = pa.Table.from_pandas(data)
+        cacheutil.write_atomic(get_path(key, DATA_EXTENSION, cache_dir),
+            lambda path: feather.write_feather(table, path, compression='uncompressed'))
+        if meta is not None:
+            cacheutil.write_atomic(get_path(key, META_EXTENSION, cache_dir),
+                lambda path: write_pickle(meta, path))
+        del table
+        shared_frames.pop(key, None)
+        mapped = map_frame(key, cache_dir)
+        if mapped is not None:
+            data = mapped
+    except (OSError, pa.ArrowException, TypeError, ValueError):
+        # frames arrow cannot represent (e.g. mixed-type object columns) are only kept in memory
+        pass
+    else:
+        cacheutil.evict_directory(cache_dir, max_bytes or CACHE_MAX_BYTES, keep=[key])
+    memory_cache.put(key, (data, meta))
+    return data if meta is None else (data, meta)
+
+
+def write_pickle(obj, path):
+    with open(path, 'wb') as f:
+        pickle.dump(obj, f, protocol=pickle.HIGHEST_PROTOCOL)
@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+
+import commonutil
+
+ONE_HOT_MAX_CATEGORIES = 50
+OTHER_CATEGORY = 'other'
+
+
+def get_categories(series):
+    return pd.Index(pd.unique(series.dropna()))
+
+
+class FittedLabelEncoder:
+    # same codes as sklearn's LabelEncoder (sorted levels), unseen levels become -1
+    def fit(self, df, columns):
+        self.columns = list(columns)
+        self.categories = {col: get_categories(df[col]).sort_values() for col in self.columns}
+        return self
+
+    def transform(self, df):
+        encoded = {col: self.categories[col].get_indexer(df[col]) for col in self.columns}
+        return df.assign(**encoded)
+
+    def fit_transform(self, df, columns):
+        return self.fit(df, columns).transform(df)
+
+
+class FittedOneHotEncoder:
+    # one sparse indicator column per kept level, levels beyond max_categories
+    # are folded into a single 'other' column so the width stays bounded
+    def __init__(self, max_categories=ONE_HOT_MAX_CATEGORIES):
+        self.max_categories = max_categories
+
+    def fit(self, df, columns):
+        self.columns = list(columns)
+        self.categories = {}
+        self.has_other = {}
+        for col in self.columns:
+            counts = df[col].value_counts(sort=True)
+            self.has_other[col] = len(counts) > self.max_categories
+            kept = counts.index
+            if self.has_other[col]:
+                # a real 'other' level goes into the bucket, its column name would clash
+                kept = kept[kept.astype(str) != OTHER_CATEGORY][:self.max_categories - 1]
+            self.categories[col] = pd.Index(kept)
+        return self
+
+    def get_column_feature_names(self, col):
+        names = [f'{col}_{level}' for level in self.categories[col]]
+        if self.has_other[col]:
+            names.append(f'{col}_{OTHER_CATEGORY}')
+        return names
+
+    def get_feature_names(self):
+        return [name for col in self.columns for name in self.get_column_feature_names(col)]
+
+    def transform_matrix(self, df):
+        # scipy is only needed once one-hot encoding is used, keep it off the startup path
+        import scipy.sparse as sp
+        n_rows = len(df)
+        blocks = []
+        for col in self.columns:
+            categories = self.categories[col]
+            codes = categories.get_indexer(df[col])
+            width = len(categories)
+            if self.has_other[col]:
+                codes = np.where((codes == -1) & df[col].notna().to_numpy(), width, codes)
+                width += 1
+            rows = np.flatnonzero(codes >= 0)
+            blocks.append(sp.csr_matrix((np.ones(len(rows), dtype=np.uint8), (rows, codes[rows])), shape=(n_rows, width)))
+        return sp.hstack(blocks, format='csr') if blocks else sp.csr_matrix((n_rows, 0), dtype=np.uint8)
+
+    def transform(self, df):
+        encoded = pd.DataFrame.sparse.from_spmatrix(self.transform_matrix(df), index=df.index, columns=self.get_feature_names())
+        return pd.concat([df.drop(columns=self.columns), encoded], axis=1)
+
+    def fit_transform(self, df, columns):
+        return self.fit(df, columns).transform(df)
+
+
+def to_model_matrix(X):
+    # sparse indicator columns go to sklearn as one CSR matrix without densifying
+    sparse_columns = [col for col in X.columns if commonutil.is_sparse_dtype(X[col].dtype)]
+    if not sparse_columns:
+        return X
+    import scipy.sparse as sp
+    dense_columns = [col for col in X.columns if col not in sparse_columns]
+    blocks = []
+    if dense_columns:
+        blocks.append(sp.csr_matrix(X[dense_columns].to_numpy(dtype=np.float64)))
+    blocks.append(X[sparse_columns].sparse.to_coo().tocsr().astype(np.float64))
+    return sp.hstack(blocks, format='csr')
@@ -0,0 +1,130 @@
+import warnings
+import pandas as pd
+
+import poolutil
+import cacheutil
+import dataingest
+
+TYPE_DATETIME = 'datetime'
+TYPE_NUMERIC = 'numeric'
+TYPE_CATEGORY = 'category'
+TYPE_TEXT = 'text'
+
+INFER_SAMPLE_SIZE = 1000
+PROCESS_MIN_CELLS = 1000000
+
+TYPE_LABELS = {
+    TYPE_DATETIME: 'date/time',
+    TYPE_NUMERIC: 'number',
+    TYPE_CATEGORY: 'category',
+}
+
+DATETIME_FORMATS = [
+    '%Y-%m-%d %H:%M:%S',
+    '%Y-%m-%d %H:%M:%S.%f',
+    '%Y-%m-%dT%H:%M:%S',
+    '%Y-%m-%dT%H:%M:%S.%f',
+    '%Y-%m-%dT%H:%M:%S%z',
+    '%Y-%m-%d %H:%M',
+    '%Y-%m-%d',
+    '%Y/%m/%d %H:%M:%S',
+    '%Y/%m/%d',
+    '%m/%d/%Y %H:%M:%S',
+    '%m/%d/%Y %H:%M',
+    '%m/%d/%Y',
+    '%d/%m/%Y %H:%M:%S',
+    '%d/%m/%Y',
+    '%d-%m-%Y',
+    '%d.%m.%Y',
+    '%d %b %Y',
+    '%b %d %Y',
+]
+
+
+inference_cache = cacheutil.LRUCache(1024)
+
+
+def get_sample(series, sample_size=INFER_SAMPLE_SIZE):
+    # stride through the column first so huge columns are never copied whole
+    values = series.iloc[::max(len(series) // sample_size, 1)].dropna()
+    if len(values) < sample_size // 10:
+        values = series.dropna()
+    return values[:sample_size].astype(str)
+
+
+def detect_datetime_format(sample):
+    for fmt in DATETIME_FORMATS:
+        if pd.to_datetime(sample, format=fmt, errors='coerce').notna().all():
+            return fmt
+    return None
+
+
+def infer_column_type(series, sample_size=INFER_SAMPLE_SIZE, category_max_ratio=dataingest.CATEGORY_MAX_RATIO):
+    sample = get_sample(series, sample_size)
+    if not len(sample):
+        return {'type': TYPE_TEXT}
+
+    fmt = detect_datetime_format(sample)
+    if fmt is not None:
+        return {'type': TYPE_DATETIME, 'format': fmt}
+
+    if pd.to_numeric(sample, errors='coerce').notna().all():
+        return {'type': TYPE_NUMERIC}
+
+    if sample.str.contains(r'\d').all():
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            if pd.to_datetime(sample, errors='coerce').notna().all():
+                return {'type': TYPE_DATETIME, 'format': None}
+
+    if sample.nunique() / len(sample) <= category_max_ratio:
+        return {'type': TYPE_CATEGORY}
+
+    return {'type': TYPE_TEXT}
+
+
+def infer_types(df, columns=None, frame_key=None):
+    columns = columns if columns is not None else list(df.columns)
+    inferred = {}
+    for col in columns:
+        if not pd.api.types.is_object_dtype(df[col].dtype):
+            continue
+        key = (frame_key, col) if frame_key is not None else None
+        inferred[col] = inference_cache.get(key) if key is not None else None
+        if inferred[col] is None:
+            inferred[col] = infer_column_type(df[col])
+            if key is not None:
+                inference_cache.put(key, inferred[col])
+    return inferred
+
+
+def convert_column(col, series, inferred):
+    try:
+        if inferred['type'] == TYPE_DATETIME:
+            try:
+                return col, pd.to_datetime(series, format=inferred.get('format')), None
+            except (ValueError, TypeError):
+                # the sampled format did not hold for every row
+                return col, pd.to_datetime(series), None
+        if inferred['type'] == TYPE_NUMERIC:
+            return col, pd.to_numeric(series), None
+        if inferred['type'] == TYPE_CATEGORY:
+            return col, series.astype('category'), None
+        return col, series, None
+    except Exception as e:
+        return col, None, f'Column \'{col}\' cannot be converted to {TYPE_LABELS[inferred["type"]]}'
+
+
+def convert_columns(df, conversions):
+    items = [(col, df[col], inferred) for col, inferred in conversions.items() if inferred['type'] != TYPE_TEXT]
+    # string parsing holds the GIL, so only a process pool gives real parallelism;
+    # it pays for the pickling once the frame is large enough
+    use_processes = len(df) * len(items) >= PROCESS_MIN_CELLS
+    converted = {}
+    messages = []
+    for col, series, message in poolutil.map_parallel(convert_column, items, use_processes=use_processes):
+        if message is not None:
+            messages.append(message)
+        else:
+            converted[col] = series
+    return (df.assign(**converted) if converted else df), messages
@@ -0,0 +1,197 @@
+import io
+import numpy as np
+import pandas as pd
+
+import datastats
+import datasketch
+
+INGEST_CHUNK_SIZE = 100000
+INGEST_SAMPLE_SIZE = 100000
+CATEGORY_MAX_RATIO = 0.5
+
+
+def downcast_dtypes(df, category_max_ratio=CATEGORY_MAX_RATIO):
+    for col in df.columns:
+        series = df[col]
+        if pd.api.types.is_bool_dtype(series):
+            continue
+        if pd.api.types.is_integer_dtype(series):
+            df[col] = pd.to_numeric(series, downcast='integer')
+        elif pd.api.types.is_float_dtype(series):
+            df[col] = pd.to_numeric(series, downcast='float')
+        elif series.dtype == object and len(series):
+            if series.nunique(dropna=True) / len(series) <= category_max_ratio:
+                df[col] = series.astype('category')
+    return df
+
+
+def promote_dtype(a, b):
+    if a is None:
+        return b
+    if a == b:
+        return a
+    if datastats.is_numeric_dtype(a) and datastats.is_numeric_dtype(b):
+        return np.result_type(a, b)
+    return np.dtype(object)
+
+
+class DataSummary:
+    def __init__(self):
+        self.n_rows = 0
+        self.columns = []
+        self.dtypes = {}
+        self.non_null = {}
+        self.memory_usage = 0
+        self.stats = None
+        self.sample = None
+        self.sketches = None
+
+    def update(self, chunk):
+        if not self.columns:
+            self.columns = list(chunk.columns)
+            self.non_null = dict.fromkeys(self.columns, 0)
+
+        for col in self.columns:
+            self.dtypes[col] = promote_dtype(self.dtypes.get(col), chunk[col].dtype)
+        for col, count in chunk.count().items():
+            self.non_null[col] += int(count)
+
+        self.n_rows += len(chunk)
+        self.memory_usage += int(chunk.memory_usage(index=False, deep=False).sum())
+        self._update_stats(chunk)
+        if self.sketches is not None:
+            self._update_sketches(chunk)
+
+    def _update_stats(self, chunk):
+        num_cols = [col for col in self.columns if datastats.is_numeric_dtype(self.dtypes[col])]
+        if self.stats is not None and num_cols != self.stats.columns:
+            # a column got promoted to object by this chunk, drop it from the running stats
+            self.stats = self.stats.select(num_cols)
+        stats = datastats.DataStats.from_frame(chunk[num_cols])
+        self.stats = stats if self.stats is None else self.stats.merge(stats)
+
+    def _update_sketches(self, chunk):
+        for col in self.columns:
+            numeric = datastats.is_numeric_dtype(self.dtypes[col])
+            if col not in self.sketches:
+                self.sketches[col] = datasketch.ColumnSketch(numeric)
+            sketch = self.sketches[col]
+            if not numeric:
+                sketch.quantiles = None
+            sketch.update(chunk[col])
+
+    def __getstate__(self):
+        # the sample is persisted as its own columnar file
+        state = self.__dict__.copy()
+        state['sample'] = None
+        return state
+
+    def rename(self, mapper):
+        self.columns = [mapper(col) for col in self.columns]
+        self.dtypes = {mapper(col): dtype for col, dtype in self.dtypes.items()}
+        self.non_null = {mapper(col): count for col, count in self.non_null.items()}
+        if self.stats is not None:
+            self.stats.columns = [mapper(col) for col in self.stats.columns]
+        if self.sketches is not None:
+            self.sketches = {mapper(col): sketch for col, sketch in self.sketches.items()}
+        if self.sample is not None:
+            self.sample.rename(mapper, axis='columns', inplace=True)
+
+    def matches(self, df):
+        # the summary only describes frames that processing left untouched
+        return self.sample is not None and df.shape == self.sample.shape \
+            and list(df.columns) == list(self.sample.columns) \
+            and (df.dtypes == self.sample.dtypes).all()
+
+    def get_dtypes(self):
+        return pd.Series([self.dtypes[col] for col in self.columns], index=self.columns, dtype=object)
+
+    def get_shape(self):
+        return (self.n_rows, len(self.columns))
+
+    def get_null_counts(self):
+        return pd.Series({col: self.n_rows - self.non_null[col] for col in self.columns}, dtype=np.int64)
+
+    def get_describe(self):
+        if self.stats is None or not self.stats.columns:
+            return self.sample.describe() if self.sample is not None else pd.DataFrame()
+        # quantiles cannot be streamed exactly, estimate them from the sketches
+        # when they were built, or else from the uniform sample
+        quantiles = None
+        if self.sketches is not None:
+            quantiles = np.column_stack([self.sketches[col].quantiles.get_quantiles(datastats.DESCRIBE_PERCENTILES)
+                for col in self.stats.columns])
+        elif self.sample is not None:
+            quantiles = self.sample[self.stats.columns].astype(np.float64) \
+                .quantile(datastats.DESCRIBE_PERCENTILES).to_numpy()
+        return self.stats.get_describe(quantiles)
+
+    def get_quantile_error(self):
+        return datasketch.QuantileSketch().get_rank_error()
+
+    def get_value_counts(self, col):
+        # lower bounds on the true counts, each at most `error` too low
+        heavy_hitters = self.sketches[col].heavy_hitters
+        return heavy_hitters.get_value_counts(), heavy_hitters.error
+
+    def get_distinct_counts(self):
+        return pd.Series({col: self.sketches[col].distinct.get_count() for col in self.columns}, dtype=np.int64)
+
+    def get_distinct_error(self):
+        return datasketch.HyperLogLog().get_relative_error()
+
+    def get_skew(self):
+        return self.stats.get_skew() if self.stats is not None else pd.Series(dtype=np.float64)
+
+    def get_cov(self):
+        return self.stats.get_cov() if self.stats is not None else pd.DataFrame()
+
+    def get_corr(self):
+        return self.stats.get_corr() if self.stats is not None else pd.DataFrame()
+
+    def info(self, buf=None):
+        text = datastats.format_info(self.columns, self.dtypes, self.non_null, self.n_rows, self.memory_usage)
+        if buf is None:
+            return text
+        buf.write(text)
+
+
+def sample_chunk(sample, chunk, sample_size, random_state):
+    # bottom-k sampling: every row draws a uniform key and the k smallest keys
+    # across the whole file form a uniform sample of bounded size
+    keys = random_state.random_sample(len(chunk))
+    chunk = chunk.assign(_sample_key=keys)
+    if sample is not None:
+        chunk = pd.concat([sample, chunk])
+    if len(chunk) > sample_size:
+        chunk = chunk.nsmallest(sample_size, '_sample_key')
+    return chunk
+
+
+def read_csv_chunks(file, nrows=None, sep=',', chunksize=INGEST_CHUNK_SIZE):
+    if isinstance(file, io.IOBase) and file.seekable():
+        file.seek(0)
+    return pd.read_csv(file, nrows=nrows, sep=sep, chunksize=chunksize)
+
+
+def load_data_chunked(file, nrows=None, sep=',', chunksize=INGEST_CHUNK_SIZE, sample_size=INGEST_SAMPLE_SIZE, random_state=42, sketch=False):
+    summary = DataSummary()
+    if sketch:
+        summary.sketches = {}
+    sample = None
+    rng = np.random.RandomState(random_state)
+    offset = 0
+
+    for chunk in read_csv_chunks(file, nrows, sep, chunksize):
+        chunk.index = pd.RangeIndex(offset, offset + len(chunk))
+        offset += len(chunk)
+        summary.update(chunk)
+        sample = sample_chunk(sample, downcast_dtypes(chunk), sample_size, rng)
+
+    if sample is None:
+        sample = pd.DataFrame(columns=summary.columns)
+    else:
+        sample = sample.drop(columns='_sample_key').sort_index()
+        sample = downcast_dtypes(sample)
+    summary.sample = sample
+    return sample, summary
@@ -0,0 +1,52 @@
+import os
+
+import cacheutil
+import datacache
+
+PIPELINE_CACHE_MAX_BYTES = int(os.environ.get('ACTIVEML_PIPELINE_CACHE_MAX_BYTES', 2 << 30))
+
+
+def get_entry_size(entry):
+    return cacheutil.get_frame_size(entry[0])
+
+
+pipeline_cache = cacheutil.LRUCache(PIPELINE_CACHE_MAX_BYTES, get_entry_size)
+
+
+class PipelineStep:
+    # func(df, **params) must not modify df and returns (df, messages), or
+    # (df, messages, fitted) when the step learns from the data; the output is
+    # shared with later reruns through the cache, and fitted.transform(df)
+    # replays the step on new rows without refitting
+    def __init__(self, name, func, **params):
+        self.name = name
+        self.func = func
+        self.params = params
+        self.fitted = None
+
+    def apply(self, df):
+        if self.fitted is not None:
+            return self.fitted.transform(df), []
+        return self.func(df, **self.params)[:2]
+
+    def get_key(self, input_key):
+        return cacheutil.get_hash(input_key, self.name, sorted(self.params.items()))
+
+
+def run_pipeline(df, steps, cache=None, input_key=None):
+    cache = pipeline_cache if cache is None else cache
+    key = input_key or cacheutil.get_frame_hash(df)
+    messages = []
+    for step in steps:
+        key = step.get_key(key)
+        entry = cache.get(key)
+        if entry is None:
+            entry = step.func(df, **step.params)
+            # a step that changed nothing hands on its input, which is already
+            # counted by the entry before it (or by the dataset cache)
+            unchanged = entry[0] is df or datacache.is_shared(entry[0])
+            cache.put(key, entry, 0 if unchanged else None)
+        df, step_messages = entry[:2]
+        step.fitted = entry[2] if len(entry) > 2 else None
+        messages += step_messages
+    return df, messages, key
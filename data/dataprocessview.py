@@ -1,13 +1,16 @@
 import streamlit as st
 import pandas as pd
-import numpy as np
-
-from sklearn.preprocessing import LabelEncoder
 
 import viewutil
+import cacheutil
+import datainfer
+import datapipeline
+import dataencoder
+import datacache
 
 LABEL_COLUMNS = 'Columns'
 LABEL_DATE_COLUMNS = 'Date Columns'
+LABEL_INFER_TYPES = 'Infer Types'
 LABEL_CATEGORICAL_COLUMNS = 'Categorical Columns'
 LABEL_NUMERICAL_COLUMNS = 'Numerical Columns'
 LABEL_OPERATIONS = 'Operations'
@@ -17,6 +20,7 @@ LABEL_RESET_INDEX = 'Reset Index'
 LABEL_ENCODER = 'Encoder'
 LABEL_ENCODER_TYPE = 'Encoder Type'
 LABEL_ENCODER_COLUMNS = 'Encode Columns'
+LABEL_MAX_CATEGORIES = 'Max Categories'
 
 ENCODER_TYPE_ONE_HOT = 'One Hot Encoder'
 ENCODER_TYPE_LABEL = 'Label Encoder'
@@ -25,48 +29,128 @@ ENCODERS_TYPES = [
     ENCODER_TYPE_LABEL
 ]
 
+def is_categorical_dtype(dtype):
+    return pd.api.types.is_object_dtype(dtype) or pd.api.types.is_categorical_dtype(dtype)
+
+def is_numeric_dtype(dtype):
+    return pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype)
+
+# Steps hand on their input, or a shallow copy of it, when they would not
+# change it, so sessions keep sharing the loaded frame's buffers
+
+def select_columns(df, columns):
+    if columns == list(df.columns):
+        return df, []
+    keep = set(columns)
+    if datacache.is_shared(df) and columns == [col for col in df.columns if col in keep]:
+        selected = df.copy(deep=False)
+        for col in df.columns:
+            if col not in keep:
+                del selected[col]
+        # still one mapped block per column, see datacache.mark_consolidated
+        return datacache.mark_consolidated(selected), []
+    return df[columns], []
+
+def convert_types(df, conversions):
+    return datainfer.convert_columns(df, conversions)
+
+def drop_null_values(df):
+    keep = df.notna().all(axis=1)
+    return (df if keep.all() else df[keep]), []
+
+def drop_duplicates(df):
+    duplicated = df.duplicated()
+    return (df[~duplicated] if duplicated.any() else df), []
+
+def reset_index(df):
+    if isinstance(df.index, pd.RangeIndex) and df.index.start == 0 and df.index.step == 1:
+        return df, []
+    result = datacache.shallow_copy(df)
+    result.index = pd.RangeIndex(len(df))
+    return result, []
+
+def encode_data(df, encoder_type, columns, max_categories=dataencoder.ONE_HOT_MAX_CATEGORIES):
+    if encoder_type == ENCODER_TYPE_LABEL:
+        encoder = dataencoder.FittedLabelEncoder()
+    elif encoder_type == ENCODER_TYPE_ONE_HOT:
+        encoder = dataencoder.FittedOneHotEncoder(max_categories)
+    else:
+        return df, []
+    return encoder.fit_transform(df, columns), [], encoder
+
+OPERATIONS = {
+    LABEL_DROP_NULL_VALUES: drop_null_values,
+    LABEL_DROP_DUPLICATES: drop_duplicates,
+    LABEL_RESET_INDEX: reset_index,
+}
+
+def get_process_steps(columns, conversions=None, operations=(), encoder=None):
+    # encoder holds encode_data's params, e.g. {'encoder_type': ..., 'columns': [...]}
+    steps = [datapipeline.PipelineStep(LABEL_COLUMNS, select_columns, columns=columns)]
+    if conversions:
+        steps.append(datapipeline.PipelineStep(LABEL_INFER_TYPES, convert_types, conversions=conversions))
+    for operation, func in OPERATIONS.items():
+        if operation in operations:
+            steps.append(datapipeline.PipelineStep(operation, func))
+    if encoder is not None and len(encoder['columns']):
+        steps.append(datapipeline.PipelineStep(LABEL_ENCODER, encode_data, **encoder))
+    return steps
+
+def process_data(df, steps, input_key=None):
+    return datapipeline.run_pipeline(df, steps, input_key=input_key)
+
 def generate_date_process_view(df):
+    dtypes = df.dtypes
+
     columns = st.multiselect(LABEL_COLUMNS, list(df.columns), list(df.columns))
-    df = df[columns]
     
-    cat_col = df.select_dtypes(include=['object']).columns.tolist()
-    num_col = df.select_dtypes(include=np.number).columns.tolist()
-    
-    date_columns = st.multiselect(LABEL_DATE_COLUMNS, cat_col)
-    for col in date_columns:
-        try:
-            df[col] = pd.to_datetime(df[col])
-        except Exception as e:
-            st.error(f'Column \'{col}\' cannot be converted to date/time')
+    cat_col = [col for col in columns if is_categorical_dtype(dtypes[col])]
+    num_col = [col for col in columns if is_numeric_dtype(dtypes[col])]
+
+    input_key = cacheutil.get_frame_hash(df)
+    inferred = datainfer.infer_types(df, cat_col, input_key)
+    infer_types = st.checkbox(LABEL_INFER_TYPES)
+    detected_date_columns = [col for col, col_type in inferred.items() if col_type['type'] == datainfer.TYPE_DATETIME]
+
+    date_columns = st.multiselect(LABEL_DATE_COLUMNS, cat_col, detected_date_columns if infer_types else [])
+
+    conversions = {}
+    for col in cat_col:
+        col_type = inferred.get(col, {'type': datainfer.TYPE_TEXT})
+        if col in date_columns:
+            fmt = col_type.get('format') if col_type['type'] == datainfer.TYPE_DATETIME else None
+            conversions[col] = {'type': datainfer.TYPE_DATETIME, 'format': fmt}
+        elif infer_types and col_type['type'] in [datainfer.TYPE_NUMERIC, datainfer.TYPE_CATEGORY]:
+            conversions[col] = col_type
 
     if cat_col is not None and date_columns is not None:
         cat_col = list(set(cat_col) - set(date_columns))
 
+    if infer_types:
+        inferred_num_col = [col for col in cat_col if conversions.get(col, {}).get('type') == datainfer.TYPE_NUMERIC]
+        cat_col = [col for col in cat_col if col not in inferred_num_col]
+        num_col += inferred_num_col
+
     categorical_columns = st.multiselect(LABEL_CATEGORICAL_COLUMNS, columns, cat_col)
     nummeric_columns = st.multiselect(LABEL_NUMERICAL_COLUMNS, num_col, num_col)
 
     viewutil.section_title(LABEL_OPERATIONS)
 
-    if st.checkbox(LABEL_DROP_NULL_VALUES):
-        df.dropna(inplace=True)
-
-    if st.checkbox(LABEL_DROP_DUPLICATES):
-        df.drop_duplicates(inplace=True)
-
-    if st.checkbox(LABEL_RESET_INDEX):
-        df.reset_index(drop=True, inplace=True)
+    operations = [operation for operation in OPERATIONS if st.checkbox(operation)]
 
+    encoder = None
     if st.checkbox(LABEL_ENCODER):
         encoder_type = st.selectbox(LABEL_ENCODER_TYPE, ENCODERS_TYPES)
-        encode_columns = st.multiselect(LABEL_ENCODER_COLUMNS, categorical_columns)
-
-        if len(encode_columns):
-            if encoder_type == ENCODER_TYPE_LABEL:
-                df.loc[:,encode_columns] = df.loc[:,encode_columns].apply(LabelEncoder().fit_transform)
-            elif encoder_type == ENCODER_TYPE_ONE_HOT:
-                df = pd.get_dummies(df, columns=encode_columns, prefix=encode_columns )
+        encoder = {'encoder_type': encoder_type, 'columns': st.multiselect(LABEL_ENCODER_COLUMNS, categorical_columns)}
+        if encoder_type == ENCODER_TYPE_ONE_HOT:
+            encoder['max_categories'] = int(st.number_input(LABEL_MAX_CATEGORIES, min_value=2,
+                value=dataencoder.ONE_HOT_MAX_CATEGORIES, step=1))
 
+    steps = get_process_steps(columns, conversions, operations, encoder)
+    df, messages, _ = process_data(df, steps, input_key)
+    for message in messages:
+        st.error(message)
 
     viewutil.view_data(df, "process")
 
-    return df, categorical_columns, nummeric_columns
\ No newline at end of file
+    return df, categorical_columns, nummeric_columns, steps
\ No newline at end of file
@@ -0,0 +1,273 @@
+import io
+import os
+import bz2
+import gzip
+import json
+import time
+import threading
+import contextlib
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+import cacheutil
+
+REMOTE_CACHE_DIR = os.environ.get('ACTIVEML_DOWNLOAD_DIR', os.path.join(os.path.expanduser('~'), '.activeml', 'downloads'))
+REMOTE_CACHE_MAX_BYTES = int(os.environ.get('ACTIVEML_DOWNLOAD_MAX_BYTES', 8 << 30))
+REMOTE_BLOCK_SIZE = 1 << 20
+REMOTE_TIMEOUT = 30
+REMOTE_RETRIES = 3
+REMOTE_VERSION_SECONDS = float(os.environ.get('ACTIVEML_DOWNLOAD_REVALIDATE_SECONDS', 30))
+
+DATA_EXTENSION = '.data'
+PART_EXTENSION = '.part'
+META_EXTENSION = '.json'
+
+GZIP_MAGIC = b'\x1f\x8b'
+BZ2_MAGIC = b'BZh'
+ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+
+_session = None
+_url_locks = {}
+_versions = {}
+_lock = threading.Lock()
+
+
+def get_session():
+    # one pooled session per process, so reruns reuse the connection
+    global _session
+    if _session is None:
+        retry = Retry(total=REMOTE_RETRIES, backoff_factor=0.5, status_forcelist=[500, 502, 503, 504])
+        _session = requests.Session()
+        _session.mount('http://', HTTPAdapter(max_retries=retry))
+        _session.mount('https://', HTTPAdapter(max_retries=retry))
+    return _session
+
+
+def is_url(file):
+    return isinstance(file, str) and file.lower().startswith(('http://', 'https://'))
+
+
+def get_path(url, extension, cache_dir=None):
+    return os.path.join(cache_dir or REMOTE_CACHE_DIR, cacheutil.get_hash('url', url) + extension)
+
+
+def read_meta(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def write_meta(meta, path):
+    def write(tmp_path):
+        with open(tmp_path, 'w') as f:
+            json.dump(meta, f)
+    cacheutil.write_atomic(path, write)
+
+
+def get_url_lock(url):
+    # one download per URL at a time: a second session waits for the first and
+    # then revalidates its copy instead of writing the same part file
+    with _lock:
+        return _url_locks.setdefault(url, threading.Lock())
+
+
+def is_encoded(response):
+    return response.headers.get('Content-Encoding', 'identity').lower() not in ['', 'identity']
+
+
+def get_version(url, cache_dir=None):
+    # The validator of the current remote content, from a HEAD request at most
+    # every REMOTE_VERSION_SECONDS, so parsed data can be cached by version.
+    # None when the server sends no validator (see datacache.get_source_hash).
+    now = time.monotonic()
+    with _lock:
+        cached = _versions.get(url)
+    if cached is not None and now - cached[0] < REMOTE_VERSION_SECONDS:
+        return cached[1]
+    try:
+        response = get_session().head(url, allow_redirects=True, timeout=REMOTE_TIMEOUT)
+        response.raise_for_status()
+        headers = response.headers
+        version = headers.get('ETag') or headers.get('Last-Modified')
+    except requests.RequestException:
+        # offline: the complete local copy is what open_url would read
+        meta = read_meta(get_path(url, META_EXTENSION, cache_dir))
+        if not meta.get('complete'):
+            raise
+        version = meta.get('etag') or meta.get('last_modified')
+    with _lock:
+        _versions[url] = (now, version)
+    return version
+
+
+def get_validators(meta):
+    headers = {}
+    if meta.get('etag'):
+        headers['If-None-Match'] = meta['etag']
+    if meta.get('last_modified'):
+        headers['If-Modified-Since'] = meta['last_modified']
+    return headers
+
+
+class RemoteReader(io.RawIOBase):
+    # Streams the response body while appending it to a local copy. A complete
+    # copy is revalidated with its ETag and read from disk on 304; a copy cut
+    # short (e.g. nrows reached) is resumed with a Range request next time,
+    # unless it was sent with a Content-Encoding: the part file holds decoded
+    # bytes, so their offsets mean nothing to the server.
+    def __init__(self, url, cache_dir=None, on_progress=None, timeout=REMOTE_TIMEOUT):
+        self.url = url
+        self.cache_dir = cache_dir or REMOTE_CACHE_DIR
+        self.on_progress = on_progress
+        self.data_path = get_path(url, DATA_EXTENSION, self.cache_dir)
+        self.part_path = get_path(url, PART_EXTENSION, self.cache_dir)
+        self.meta_path = get_path(url, META_EXTENSION, self.cache_dir)
+        self.bytes_read = 0
+        self.total = None
+        self.local = None
+        self.local_remaining = 0
+        self.response = None
+        self.part = None
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.lock = get_url_lock(url)
+        self.lock.acquire()
+        try:
+            self._open(timeout)
+        except BaseException:
+            self.close()
+            raise
+
+    def _open(self, timeout):
+        meta = read_meta(self.meta_path)
+        has_copy = meta.get('complete') and os.path.isfile(self.data_path)
+        resumable = not has_copy and meta.get('etag') and not meta.get('encoded')
+        offset = os.path.getsize(self.part_path) if resumable and os.path.isfile(self.part_path) else 0
+
+        headers = {}
+        if has_copy:
+            headers = get_validators(meta)
+        elif offset:
+            headers = {'Range': f'bytes={offset}-', 'If-Range': meta['etag'], 'Accept-Encoding': 'identity'}
+
+        try:
+            response = get_session().get(self.url, headers=headers, stream=True, timeout=timeout)
+        except requests.ConnectionError:
+            if not has_copy:
+                raise
+            return self._open_local(self.data_path, os.path.getsize(self.data_path))
+
+        if response.status_code == 304 and has_copy:
+            response.close()
+            cacheutil.touch(self.meta_path)
+            return self._open_local(self.data_path, os.path.getsize(self.data_path))
+        if response.status_code == 416 and offset:
+            # the partial copy already holds the whole body, fetch it again
+            response.close()
+            os.remove(self.part_path)
+            return self._open(timeout)
+        if response.status_code == 206 and is_encoded(response):
+            # a range of an encoded body cannot be decoded on its own
+            response.close()
+            os.remove(self.part_path)
+            write_meta(dict(meta, encoded=True), self.meta_path)
+            return self._open(timeout)
+        response.raise_for_status()
+
+        length = response.headers.get('Content-Length')
+        if response.status_code == 206:
+            self._open_local(self.part_path, offset)
+            self.part = open(self.part_path, 'ab')
+        else:
+            offset = 0
+            self.part = open(self.part_path, 'wb')
+            write_meta({
+                'url': self.url,
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+                'encoded': is_encoded(response),
+                'complete': False,
+            }, self.meta_path)
+        self.total = offset + int(length) if length is not None else None
+        self.response = response
+
+    def _open_local(self, path, size):
+        self.local = open(path, 'rb')
+        self.local_remaining = size
+        if self.total is None:
+            self.total = size
+
+    def _finish(self):
+        self.part.close()
+        os.replace(self.part_path, self.data_path)
+        meta = read_meta(self.meta_path)
+        meta['complete'] = True
+        write_meta(meta, self.meta_path)
+        self.response.close()
+        self.response = None
+        cacheutil.evict_directory(self.cache_dir, REMOTE_CACHE_MAX_BYTES, keep=[cacheutil.get_hash('url', self.url)])
+
+    def _progress(self, n):
+        self.bytes_read += n
+        if self.on_progress is not None:
+            self.on_progress(self.bytes_read, self.total)
+        return n
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        view = memoryview(b)
+        if self.local_remaining:
+            n = self.local.readinto(view[:min(len(view), self.local_remaining)])
+            self.local_remaining = self.local_remaining - n if n else 0
+            if n:
+                return self._progress(n)
+        if self.response is None:
+            return 0
+        data = self.response.raw.read(len(view), decode_content=True)
+        if not data:
+            self._finish()
+            return 0
+        self.part.write(data)
+        view[:len(data)] = data
+        return self._progress(len(data))
+
+    def close(self):
+        # closing early drops the connection, so nothing past nrows is downloaded
+        if self.response is not None:
+            self.response.close()
+        for f in [self.part, self.local]:
+            if f is not None:
+                f.close()
+        lock, self.lock = getattr(self, 'lock', None), None
+        if lock is not None:
+            lock.release()
+        super().close()
+
+
+def decompress(stream):
+    magic = stream.peek(len(ZSTD_MAGIC))[:len(ZSTD_MAGIC)]
+    if magic.startswith(GZIP_MAGIC):
+        return gzip.GzipFile(fileobj=stream, mode='rb')
+    if magic.startswith(BZ2_MAGIC):
+        return bz2.BZ2File(stream)
+    if magic.startswith(ZSTD_MAGIC):
+        try:
+            import zstandard
+        except ImportError:
+            raise ImportError('Reading zstd compressed data requires the zstandard package')
+        return zstandard.ZstdDecompressor().stream_reader(stream)
+    return stream
+
+
+@contextlib.contextmanager
+def open_url(url, on_progress=None, cache_dir=None):
+    raw = RemoteReader(url, cache_dir, on_progress)
+    try:
+        with io.BufferedReader(raw, REMOTE_BLOCK_SIZE) as stream:
+            yield decompress(stream)
+    finally:
+        raw.close()
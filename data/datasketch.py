@@ -0,0 +1,173 @@
+import numpy as np
+import pandas as pd
+
+QUANTILE_SKETCH_K = 200
+HEAVY_HITTERS_SIZE = 1000
+HLL_PRECISION = 14
+SKETCH_RANDOM_STATE = 0
+
+
+class QuantileSketch:
+    # KLL-style compactor hierarchy: level h holds items of weight 2**h, and a
+    # full level is sorted and every other item (random offset) promoted.
+    # Mergeable by concatenating levels.
+    def __init__(self, k=QUANTILE_SKETCH_K, random_state=SKETCH_RANDOM_STATE):
+        self.k = k
+        self.n = 0
+        self.min = np.inf
+        self.max = -np.inf
+        self.levels = [np.empty(0)]
+        self._random = np.random.RandomState(random_state)
+
+    def _get_capacity(self, level):
+        depth = len(self.levels) - level - 1
+        return max(int(np.ceil(self.k * (2 / 3) ** depth)), 8)
+
+    def _compress(self):
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) > self._get_capacity(level):
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                items = np.sort(items)
+                odd = len(items) % 2
+                self.levels[level] = items[len(items) - odd:]
+                promoted = items[self._random.randint(2):len(items) - odd:2]
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+            level += 1
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return self
+        self.n += len(values)
+        self.min = min(self.min, values.min())
+        self.max = max(self.max, values.max())
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+        return self
+
+    def merge(self, other):
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.n += other.n
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress()
+        return self
+
+    def get_quantiles(self, quantiles):
+        quantiles = np.asarray(quantiles, dtype=np.float64)
+        if not self.n:
+            return np.full(len(quantiles), np.nan)
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(items), 2 ** level) for level, items in enumerate(self.levels)])
+        order = np.argsort(items, kind='mergesort')
+        items, ranks = items[order], np.cumsum(weights[order])
+        index = np.searchsorted(ranks, quantiles * ranks[-1], side='left')
+        values = items[np.minimum(index, len(items) - 1)]
+        return np.where(quantiles <= 0, self.min, np.where(quantiles >= 1, self.max, values))
+
+    def get_rank_error(self):
+        # DataSketches' empirical single-sided bound for KLL at 99% confidence
+        return 2.296 / self.k ** 0.9723
+
+
+class HeavyHitters:
+    # Misra-Gries summary: counts are lower bounds that are at most `error`
+    # below the true count, and error <= n / (size + 1)
+    def __init__(self, size=HEAVY_HITTERS_SIZE):
+        self.size = size
+        self.n = 0
+        self.error = 0
+        self.counts = pd.Series(dtype=np.int64)
+
+    def _add(self, counts, n):
+        self.n += n
+        counts = self.counts.add(counts, fill_value=0).astype(np.int64)
+        if len(counts) > self.size:
+            kth = int(counts.nlargest(self.size + 1).iloc[-1])
+            counts = counts[counts > kth] - kth
+            self.error += kth
+        self.counts = counts
+
+    def update(self, series):
+        counts = series.value_counts()
+        self._add(counts, int(counts.sum()))
+        return self
+
+    def merge(self, other):
+        self.error += other.error
+        self._add(other.counts, other.n)
+        return self
+
+    def get_value_counts(self, n=None):
+        counts = self.counts.sort_values(ascending=False)
+        return counts if n is None else counts.iloc[:n]
+
+
+class HyperLogLog:
+    def __init__(self, precision=HLL_PRECISION):
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    def update(self, series):
+        values = series.dropna()
+        if not len(values):
+            return self
+        # hash numbers as float64 so 1 and 1.0 in different chunks count once
+        if pd.api.types.is_numeric_dtype(values.dtype) and not pd.api.types.is_bool_dtype(values.dtype):
+            values = values.astype(np.float64)
+        hashes = pd.util.hash_array(values.to_numpy())
+        bits = 64 - self.precision
+        index = (hashes >> np.uint64(bits)).astype(np.int64)
+        rest = (hashes & np.uint64((1 << bits) - 1)).astype(np.float64)
+        _, exponent = np.frexp(rest)
+        rank = np.where(rest > 0, bits - exponent + 1, bits + 1).astype(np.uint8)
+        register_max = pd.Series(rank).groupby(index).max()
+        current = self.registers[register_max.index.to_numpy()]
+        self.registers[register_max.index.to_numpy()] = np.maximum(current, register_max.to_numpy())
+        return self
+
+    def merge(self, other):
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def get_count(self):
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * np.log(m / zeros)
+        return int(round(estimate))
+
+    def get_relative_error(self):
+        return 1.04 / np.sqrt(len(self.registers))
+
+
+class ColumnSketch:
+    def __init__(self, numeric):
+        self.quantiles = QuantileSketch() if numeric else None
+        self.heavy_hitters = HeavyHitters()
+        self.distinct = HyperLogLog()
+
+    def update(self, series):
+        if self.quantiles is not None:
+            self.quantiles.update(series.to_numpy(dtype=np.float64, na_value=np.nan))
+        self.heavy_hitters.update(series)
+        self.distinct.update(series)
+        return self
+
+    def merge(self, other):
+        if self.quantiles is not None and other.quantiles is not None:
+            self.quantiles.merge(other.quantiles)
+        else:
+            self.quantiles = None
+        self.heavy_hitters.merge(other.heavy_hitters)
+        self.distinct.merge(other.distinct)
+        return self
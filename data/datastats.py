@@ -0,0 +1,255 @@
+import os
+import numpy as np
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+
+DESCRIBE_PERCENTILES = [0.25, 0.5, 0.75]
+# rows per block are chosen so one float64 block is about this size; the
+# kernel's temporaries are a small multiple of it per thread
+STATS_BLOCK_BYTES = 2 << 20
+STATS_MIN_BLOCK_ROWS = 4096
+STATS_MAX_THREADS = 4
+
+
+def is_numeric_dtype(dtype):
+    # sparse one-hot indicators would be densified by the fused kernel
+    return (pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype)
+        and not isinstance(dtype, pd.SparseDtype))
+
+
+def get_numeric_columns(df):
+    return [col for col in df.columns if is_numeric_dtype(df[col].dtype)]
+
+
+class DataStats:
+    # Power sums of the numeric block taken about a per-column shift. Pairwise
+    # sums (over rows where both columns are present) give pandas' pairwise
+    # cov/corr, the diagonals give per-column moments. Partials over disjoint
+    # rows are merged by moving them to a common shift and adding.
+    def __init__(self, columns, n_rows, shift, n, s, q, c, t, minimum, maximum, quantiles=None):
+        self.columns = list(columns)
+        self.n_rows = n_rows
+        self.shift = shift
+        self.n = n
+        self.s = s
+        self.q = q
+        self.c = c
+        self.t = t
+        self.min = minimum
+        self.max = maximum
+        self.quantiles = quantiles
+
+    @classmethod
+    def from_values(cls, values, columns):
+        values = np.asarray(values, dtype=np.float64)
+        mask = ~np.isnan(values)
+        weights = mask.astype(np.float64)
+        count = weights.sum(axis=0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            shift = np.where(count > 0, np.where(mask, values, 0.0).sum(axis=0) / count, 0.0)
+        x = np.where(mask, values - shift, 0.0)
+        x2 = x * x
+        return cls(
+            columns,
+            len(values),
+            shift,
+            weights.T @ weights,
+            x.T @ weights,
+            x2.T @ weights,
+            x.T @ x,
+            (x2 * x).sum(axis=0),
+            np.where(mask, values, np.inf).min(axis=0, initial=np.inf),
+            np.where(mask, values, -np.inf).max(axis=0, initial=-np.inf))
+
+    @classmethod
+    def from_frame(cls, df):
+        columns = get_numeric_columns(df)
+        return cls.from_values(df[columns].to_numpy(dtype=np.float64), columns)
+
+    @classmethod
+    def from_frame_parallel(cls, df, n_jobs=None, block_bytes=STATS_BLOCK_BYTES):
+        # Blocks of rows are converted and reduced one at a time per thread, so
+        # the whole numeric block is never materialised; numpy releases the GIL
+        # inside the matrix products, so threads scale
+        columns = get_numeric_columns(df)
+        block_rows = max(block_bytes // (8 * max(len(columns), 1)), STATS_MIN_BLOCK_ROWS)
+        starts = range(0, max(len(df), 1), block_rows)
+
+        def get_block_stats(start):
+            block = df.iloc[start:start + block_rows]
+            values = np.empty((len(block), len(columns)))
+            for i, col in enumerate(columns):
+                values[:, i] = block[col].to_numpy(dtype=np.float64, na_value=np.nan)
+            return cls.from_values(values, columns)
+        if len(starts) == 1:
+            return get_block_stats(0)
+        with ThreadPoolExecutor(n_jobs or min(os.cpu_count(), STATS_MAX_THREADS)) as executor:
+            partials = list(executor.map(get_block_stats, starts))
+        return merge_stats(partials)
+
+    def with_shift(self, shift):
+        d = self.shift - shift
+        s = self.s + self.n * d[:, None]
+        q = self.q + 2 * d[:, None] * self.s + self.n * (d ** 2)[:, None]
+        c = self.c + self.s * d[None, :] + self.s.T * d[:, None] + self.n * np.outer(d, d)
+        s_diag = np.diag(self.s)
+        q_diag = np.diag(self.q)
+        n_diag = np.diag(self.n)
+        t = self.t + 3 * d * q_diag + 3 * d ** 2 * s_diag + n_diag * d ** 3
+        return DataStats(self.columns, self.n_rows, shift, self.n, s, q, c, t, self.min, self.max)
+
+    def merge(self, other):
+        if self.columns != other.columns:
+            raise ValueError('Cannot merge statistics over different columns')
+        count = np.diag(self.n) + np.diag(other.n)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            shift = np.where(count > 0, (np.diag(self.s) + np.diag(self.n) * self.shift
+                + np.diag(other.s) + np.diag(other.n) * other.shift) / count, 0.0)
+        a = self.with_shift(shift)
+        b = other.with_shift(shift)
+        return DataStats(
+            self.columns,
+            self.n_rows + other.n_rows,
+            shift,
+            a.n + b.n,
+            a.s + b.s,
+            a.q + b.q,
+            a.c + b.c,
+            a.t + b.t,
+            np.minimum(a.min, b.min),
+            np.maximum(a.max, b.max))
+
+    def select(self, columns):
+        index = [self.columns.index(col) for col in columns]
+        grid = np.ix_(index, index)
+        quantiles = self.quantiles[:, index] if self.quantiles is not None else None
+        return DataStats(columns, self.n_rows, self.shift[index], self.n[grid], self.s[grid], self.q[grid],
+            self.c[grid], self.t[index], self.min[index], self.max[index], quantiles)
+
+    def get_count(self):
+        return pd.Series(np.diag(self.n), index=self.columns)
+
+    def get_null_counts(self):
+        return pd.Series((self.n_rows - np.diag(self.n)).astype(np.int64), index=self.columns)
+
+    def _get_central_moments(self):
+        n = np.diag(self.n)
+        s = np.diag(self.s)
+        q = np.diag(self.q)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = s / n
+            m2 = np.maximum(q - s * mean, 0.0)
+            m3 = self.t - 3 * mean * q + 2 * s * mean ** 2
+        return n, self.shift + mean, m2, m3
+
+    def get_mean(self):
+        n, mean, _, _ = self._get_central_moments()
+        return pd.Series(np.where(n > 0, mean, np.nan), index=self.columns)
+
+    def get_std(self):
+        n, _, m2, _ = self._get_central_moments()
+        with np.errstate(invalid='ignore', divide='ignore'):
+            std = np.sqrt(m2 / (n - 1))
+        return pd.Series(np.where(n > 1, std, np.nan), index=self.columns)
+
+    def get_skew(self):
+        n, _, m2, m3 = self._get_central_moments()
+        with np.errstate(invalid='ignore', divide='ignore'):
+            g1 = (m3 / n) / (m2 / n) ** 1.5
+            skew = np.sqrt(n * (n - 1)) / (n - 2) * g1
+        skew = np.where(m2 == 0, 0.0, skew)
+        return pd.Series(np.where(n < 3, np.nan, skew), index=self.columns)
+
+    def _get_pairwise(self):
+        with np.errstate(invalid='ignore', divide='ignore'):
+            cross = self.c - self.s * self.s.T / self.n
+            var_row = np.maximum(self.q - self.s ** 2 / self.n, 0.0)
+        return cross, var_row
+
+    def get_cov(self):
+        cross, _ = self._get_pairwise()
+        with np.errstate(invalid='ignore', divide='ignore'):
+            cov = np.where(self.n > 1, cross / (self.n - 1), np.nan)
+        return pd.DataFrame(cov, index=self.columns, columns=self.columns)
+
+    def get_corr(self):
+        cross, var_row = self._get_pairwise()
+        with np.errstate(invalid='ignore', divide='ignore'):
+            corr = cross / np.sqrt(var_row * var_row.T)
+        corr = np.clip(np.where(self.n > 1, corr, np.nan), -1.0, 1.0)
+        return pd.DataFrame(corr, index=self.columns, columns=self.columns)
+
+    def get_describe(self, quantiles=None):
+        n = np.diag(self.n)
+        quantiles = self.quantiles if quantiles is None else quantiles
+        if quantiles is None:
+            quantiles = np.full((len(DESCRIBE_PERCENTILES), len(self.columns)), np.nan)
+        rows = [
+            ('count', n),
+            ('mean', self.get_mean().values),
+            ('std', self.get_std().values),
+            ('min', np.where(n > 0, self.min, np.nan)),
+        ]
+        rows += [(f'{p:.0%}', quantiles[i]) for i, p in enumerate(DESCRIBE_PERCENTILES)]
+        rows.append(('max', np.where(n > 0, self.max, np.nan)))
+        return pd.DataFrame(dict(rows), index=self.columns).T
+
+
+def merge_stats(partials):
+    stats = partials[0]
+    for other in partials[1:]:
+        stats = stats.merge(other)
+    return stats
+
+
+def format_bytes(n_bytes):
+    for unit in ['bytes', 'KB', 'MB', 'GB']:
+        if n_bytes < 1024 or unit == 'GB':
+            return f'{n_bytes:.1f}+ {unit}' if unit != 'bytes' else f'{n_bytes}+ {unit}'
+        n_bytes /= 1024.0
+
+
+def format_info(columns, dtypes, non_null, n_rows, memory_usage):
+    lines = [
+        "<class 'pandas.core.frame.DataFrame'>",
+        f'RangeIndex: {n_rows} entries, 0 to {max(n_rows - 1, 0)}',
+        f'Data columns (total {len(columns)} columns):',
+    ]
+    width = max([len('Column')] + [len(str(col)) for col in columns])
+    lines.append(f' #   {"Column".ljust(width)}  Non-Null Count  Dtype  ')
+    lines.append(f'---  {"------".ljust(width)}  --------------  -----  ')
+    for i, col in enumerate(columns):
+        count = f'{non_null[col]} non-null'
+        lines.append(f' {str(i).ljust(3)} {str(col).ljust(width)}  {count.ljust(14)}  {str(dtypes[col]).ljust(7)}')
+    counts = pd.Series([str(dtypes[col]) for col in columns], dtype=object).value_counts().sort_index()
+    lines.append('dtypes: ' + ', '.join(f'{dtype}({count})' for dtype, count in counts.items()))
+    lines.append(f'memory usage: {format_bytes(memory_usage)}')
+    return '\n'.join(lines) + '\n'
+
+
+def get_frame_info(df, null_counts):
+    non_null = {col: len(df) - int(null_counts[col]) for col in df.columns}
+    memory_usage = int(df.memory_usage(index=True, deep=False).sum())
+    return format_info(list(df.columns), df.dtypes, non_null, len(df), memory_usage)
+
+
+def get_quantiles(df, columns):
+    # one column at a time, a copy of the whole numeric block is what the
+    # blocked moments avoid
+    quantiles = np.full((len(DESCRIBE_PERCENTILES), len(columns)), np.nan)
+    for i, col in enumerate(columns):
+        values = df[col].to_numpy(dtype=np.float64, na_value=np.nan)
+        values = values[~np.isnan(values)]
+        if len(values):
+            quantiles[:, i] = np.percentile(values, [p * 100 for p in DESCRIBE_PERCENTILES])
+    return quantiles
+
+
+def get_frame_stats(df):
+    # blocked passes over the numeric columns for moments and cross products,
+    # quantiles per column, plus a null count over the remaining columns
+    stats = DataStats.from_frame_parallel(df)
+    stats.quantiles = get_quantiles(df, stats.columns)
+    other_columns = [col for col in df.columns if col not in stats.columns]
+    null_counts = pd.concat([stats.get_null_counts(), df[other_columns].isnull().sum().astype(np.int64)])
+    return stats, null_counts.reindex(df.columns)
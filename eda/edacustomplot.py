@@ -2,6 +2,9 @@ import streamlit as st
 import matplotlib.pyplot as plt
 import seaborn as sns
 
+import edaplotdata
+import viewutil
+
 PLOT_TYPE_BOX = 'Box'
 PLOT_TYPE_COUNT = 'Count'
 PLOT_TYPE_DIST = 'Distribution'
@@ -24,13 +27,24 @@ LABEL_X = 'X'
 LABEL_Y = 'Y'
 LABEL_Z = 'Hue'
 
-def st_plot(plot):
-    try:
-        st.pyplot(plot.get_figure(), clear_figure=True)
-    except Exception as e:
-        st.error(e)
+def make_plot(df, plot_type, x=None, y=None, z=None, point_budget=edaplotdata.PLOT_POINT_BUDGET):
+    if plot_type == PLOT_TYPE_BOX:
+        return edaplotdata.plot_box(df, x, y, z, point_budget)
+    elif plot_type == PLOT_TYPE_COUNT:
+        return sns.countplot(x=x, data=df)
+    elif plot_type == PLOT_TYPE_DIST:
+        return edaplotdata.plot_dist(df[x], point_budget)
+    elif plot_type == PLOT_TYPE_HISTOGRAM:
+        return edaplotdata.plot_hist(df[x], point_budget)
+    elif plot_type == PLOT_TYPE_LINE:
+        return edaplotdata.plot_line(df, x, y, z, point_budget)
+    elif plot_type == PLOT_TYPE_SCATTER:
+        return edaplotdata.plot_scatter(df, x, y, z, point_budget)
+    elif plot_type == PLOT_TYPE_SWARM:
+        return edaplotdata.plot_swarm(df, x, y, z, point_budget)
+    return None
 
-def generate_plot_view(df):
+def generate_plot_view(df, point_budget=edaplotdata.PLOT_POINT_BUDGET):
     x = y = z = None
     plot_type = st.selectbox(LABEL_PLOT_TYPE, PLOT_TYPES)
     col1, col2, col3 = st.beta_columns(3)
@@ -43,21 +57,8 @@ def generate_plot_view(df):
         if plot_type not in [PLOT_TYPE_COUNT, PLOT_TYPE_DIST, PLOT_TYPE_HISTOGRAM]:
             z = st.selectbox(LABEL_Z, [None] + list(df.columns))
 
-    try:
-        if plot_type == PLOT_TYPE_BOX:
-            st_plot(sns.boxplot(x=x, y=y, hue=z, data=df))
-        elif plot_type == PLOT_TYPE_COUNT:
-            st_plot(sns.countplot(x=x, data=df))
-        elif plot_type == PLOT_TYPE_DIST:
-            st_plot(sns.distplot(df[x]))        
-        elif plot_type == PLOT_TYPE_HISTOGRAM:
-            st_plot(sns.histplot(df[x]))
-        elif plot_type == PLOT_TYPE_LINE:
-            st_plot(sns.lineplot(x=x, y=y, hue=z, data=df))
-        elif plot_type == PLOT_TYPE_SCATTER:
-            st_plot(sns.scatterplot(x=x, y=y, hue=z, data=df))
-        elif plot_type == PLOT_TYPE_SWARM:
-            st_plot(sns.swarmplot(x=x, y=y, hue=z, data=df))
-    except Exception as e:
-        if str(e) != "None":
-            st.error(e)
\ No newline at end of file
+    if x is None and (y is None or plot_type in [PLOT_TYPE_COUNT, PLOT_TYPE_DIST, PLOT_TYPE_HISTOGRAM]):
+        return
+
+    plot = lambda: make_plot(df, plot_type, x, y, z, point_budget)
+    viewutil.st_plot(plot, viewutil.get_plot_key(df, plot_type, x, y, z, point_budget))
\ No newline at end of file
@@ -1,5 +1,4 @@
 import streamlit as st
-import numpy as np
 import maputil
 
 LABEL_LATITUDE_COLUMN = 'Latitude Column'
@@ -8,6 +7,8 @@ LABEL_ZOOM = 'Zoom'
 LABEL_PITCH = 'Pitch'
 LABEL_STYLE = 'Style'
 LABEL_RADIUS = 'Radius'
+LABEL_BINNING = 'Binning'
+LABEL_WEIGHT_COLUMN = 'Weight Column'
 
 import commonutil
 
@@ -17,15 +18,25 @@ def generate_map_view(df):
     col1, col2, col3 = st.beta_columns(3)
     with col1:
         lat_col = st.selectbox(LABEL_LATITUDE_COLUMN, [''] + columns, commonutil.find_index_from_list(columns, 'lat') + 1)
-        zoom = st.number_input(LABEL_ZOOM, 1, 20, 11)
     with col2:
         lon_col = st.selectbox(LABEL_LONGITUDE_COLUMN, [''] + columns, commonutil.find_index_from_list(columns, 'lon') + 1)
-        pitch = st.number_input(LABEL_PITCH, 0, 100, 50)
     with col3:
+        weight_col = st.selectbox(LABEL_WEIGHT_COLUMN, [''] + columns)
+
+    if lat_col == '' or lon_col == '':
+        return
+
+    data, (lat, lon, fit_zoom) = maputil.get_map_data(df, lat_col, lon_col, weight_col)
+    with col1:
+        zoom = st.number_input(LABEL_ZOOM, 1, 20, fit_zoom)
         map_style = st.selectbox(LABEL_STYLE, maputil.get_mapbox_styles())
+    with col2:
+        pitch = st.number_input(LABEL_PITCH, 0, 100, 50)
+        binning = st.selectbox(LABEL_BINNING, maputil.get_binning_types())
+    with col3:
         radius = st.number_input(LABEL_RADIUS, 1, 1000000, 100)
 
-    
-    if lat_col is not '' and lon_col is not '':
-        midpoint = (np.average(df[lat_col]), np.average(df[lon_col]))
-        st.write(maputil.get_mapbox_map(df, lat_col, lon_col, midpoint[0], midpoint[1], zoom=zoom, pitch=pitch, radius=radius, style=map_style))
\ No newline at end of file
+    if len(data) < len(df):
+        st.write(f'{len(df) - len(data):,} rows without valid coordinates are not shown')
+    st.write(maputil.get_mapbox_map(data, 'lat', 'lon', lat, lon, zoom=zoom, pitch=pitch, radius=radius, style=map_style,
+        binning=binning, weight_col='weight' if weight_col else None))
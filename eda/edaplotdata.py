@@ -0,0 +1,180 @@
+import numpy as np
+import pandas as pd
+
+PLOT_POINT_BUDGET = 5000
+SWARM_POINT_BUDGET = 1000
+HISTOGRAM_MAX_BINS = 50
+PLOT_RANDOM_STATE = 0
+
+LABEL_POINT_BUDGET = 'Plot Point Budget'
+
+# matplotlib and seaborn are imported by the plot functions themselves, so the
+# sampling helpers and constants load without them
+
+
+def sample_rows(df, n, stratify=None, random_state=PLOT_RANDOM_STATE):
+    if len(df) <= n:
+        return df
+    keys = np.random.RandomState(random_state).random_sample(len(df))
+    keep = keys < n / len(df)
+    if stratify:
+        # Bernoulli sampling keeps each stratum's share, and the row with the
+        # smallest key of every stratum is kept so rare levels never disappear
+        codes = df.groupby(stratify, sort=False).ngroup().to_numpy()
+        order = np.lexsort((keys, codes))
+        first = order[np.r_[True, codes[order][1:] != codes[order][:-1]]]
+        keep[first] = True
+    return df.iloc[np.flatnonzero(keep)]
+
+
+def annotate(ax, text):
+    ax.annotate(text, xy=(1, 1), xycoords='axes fraction', ha='right', va='bottom', fontsize='x-small', color='gray')
+    return ax
+
+
+def annotate_sample(ax, n_shown, n_total):
+    return annotate(ax, f'sample of {n_shown:,} / {n_total:,} rows') if n_shown < n_total else ax
+
+
+def get_bin_edges(values, max_bins=HISTOGRAM_MAX_BINS):
+    # Freedman-Diaconis like seaborn's distplot, capped so the payload stays fixed
+    low, high = values.min(), values.max()
+    q1, q3 = np.percentile(values, [25, 75])
+    width = 2 * (q3 - q1) * len(values) ** (-1 / 3)
+    bins = int(np.ceil((high - low) / width)) if width > 0 else int(np.sqrt(len(values)))
+    return np.linspace(low, high, max(min(bins, max_bins), 1) + 1)
+
+
+def get_histogram(series, max_bins=HISTOGRAM_MAX_BINS):
+    values = series.dropna().to_numpy(dtype=np.float64)
+    counts, edges = np.histogram(values, bins=get_bin_edges(values, max_bins))
+    bins = pd.DataFrame({series.name: (edges[:-1] + edges[1:]) / 2, 'count': counts})
+    return bins, edges
+
+
+def get_box_stats(values, label, max_fliers):
+    q1, median, q3 = np.percentile(values, [25, 50, 75])
+    low, high = q1 - 1.5 * (q3 - q1), q3 + 1.5 * (q3 - q1)
+    inside = (values >= low) & (values <= high)
+    fliers = values[~inside]
+    if len(fliers) > max_fliers:
+        fliers = np.random.RandomState(PLOT_RANDOM_STATE).choice(fliers, max_fliers, replace=False)
+    return {
+        'label': label,
+        'q1': q1,
+        'med': median,
+        'q3': q3,
+        'whislo': values[inside].min() if inside.any() else q1,
+        'whishi': values[inside].max() if inside.any() else q3,
+        'fliers': fliers,
+    }
+
+
+def plot_count(series, counts=None):
+    import seaborn as sns
+    counts = series.value_counts() if counts is None else counts
+    ax = sns.barplot(x=counts.index.astype(str), y=counts.values)
+    ax.set(xlabel=series.name, ylabel='count')
+    return ax
+
+
+def plot_dist(series, budget=PLOT_POINT_BUDGET):
+    import seaborn as sns
+    n_total = int(series.count())
+    if n_total <= budget:
+        return sns.distplot(series)
+    bins, edges = get_histogram(series)
+    ax = sns.histplot(data=bins, x=series.name, weights='count', bins=edges.tolist(), stat='density', alpha=0.4)
+    sns.kdeplot(data=bins, x=series.name, weights='count', ax=ax)
+    return annotate(ax, f'binned from {n_total:,} rows')
+
+
+def plot_hist(series, budget=PLOT_POINT_BUDGET):
+    import seaborn as sns
+    n_total = int(series.count())
+    if n_total <= budget:
+        return sns.histplot(series)
+    bins, edges = get_histogram(series)
+    ax = sns.histplot(data=bins, x=series.name, weights='count', bins=edges.tolist())
+    return annotate(ax, f'binned from {n_total:,} rows')
+
+
+def get_box_summary(df, x=None, y=None, hue=None, budget=PLOT_POINT_BUDGET):
+    # five-number summaries and a sample of fliers per group; this is all
+    # plot_box_summary needs, however many rows the groups hold
+    vertical = y is not None and pd.api.types.is_numeric_dtype(df[y])
+    value_col = y if vertical else x
+    group_cols = [col for col in [x if vertical else y, hue] if col is not None]
+    data = df[group_cols + [value_col]].dropna()
+
+    if group_cols:
+        groups = [(', '.join(map(str, key if isinstance(key, tuple) else (key,))), group[value_col])
+            for key, group in data.groupby(group_cols if len(group_cols) > 1 else group_cols[0], sort=True)]
+    else:
+        groups = [('', data[value_col])]
+    max_fliers = max(budget // max(len(groups), 1), 1)
+    return {
+        'stats': [get_box_stats(values.to_numpy(dtype=np.float64), label, max_fliers) for label, values in groups],
+        'vertical': vertical,
+        'group_cols': group_cols,
+        'value_col': value_col,
+        'n_rows': len(data),
+    }
+
+
+def plot_box_summary(summary):
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    ax = plt.gca()
+    ax.bxp(summary['stats'], vert=summary['vertical'], patch_artist=True,
+        boxprops={'facecolor': sns.color_palette()[0], 'alpha': 0.8},
+        flierprops={'marker': 'd', 'markersize': 3})
+    group_label = ', '.join(summary['group_cols'])
+    if summary['vertical']:
+        ax.set(xlabel=group_label, ylabel=summary['value_col'])
+    else:
+        ax.set(xlabel=summary['value_col'], ylabel=group_label)
+    return annotate(ax, f'quantiles of {summary["n_rows"]:,} rows')
+
+
+def plot_box(df, x=None, y=None, hue=None, budget=PLOT_POINT_BUDGET):
+    import seaborn as sns
+    if len(df) <= budget:
+        return sns.boxplot(x=x, y=y, hue=hue, data=df)
+    return plot_box_summary(get_box_summary(df, x, y, hue, budget))
+
+
+def plot_heatmap(data, annot=True):
+    import seaborn as sns
+    return sns.heatmap(data, annot=annot)
+
+
+def plot_scatter(df, x, y, hue=None, budget=PLOT_POINT_BUDGET, n_total=None):
+    import seaborn as sns
+    data = sample_rows(df, budget, hue)
+    ax = sns.scatterplot(x=x, y=y, hue=hue, data=data)
+    return annotate_sample(ax, len(data), n_total or len(df))
+
+
+def get_swarm_sample(df, x=None, hue=None, budget=PLOT_POINT_BUDGET):
+    # beeswarm layout is roughly quadratic, so it gets its own tighter budget
+    strata = [col for col in [x, hue] if col is not None]
+    return sample_rows(df, min(budget, SWARM_POINT_BUDGET), strata)
+
+
+def plot_swarm(df, x=None, y=None, hue=None, budget=PLOT_POINT_BUDGET, n_total=None):
+    import seaborn as sns
+    data = get_swarm_sample(df, x, hue, budget)
+    ax = sns.swarmplot(x=x, y=y, hue=hue, data=data)
+    return annotate_sample(ax, len(data), n_total or len(df))
+
+
+def plot_line(df, x, y, hue=None, budget=PLOT_POINT_BUDGET):
+    import seaborn as sns
+    if len(df) <= budget:
+        return sns.lineplot(x=x, y=y, hue=hue, data=df)
+    keys = [col for col in [x, hue] if col is not None]
+    data = df.groupby(keys, sort=True)[y].mean().reset_index()
+    data = sample_rows(data, budget, hue)
+    ax = sns.lineplot(x=x, y=y, hue=hue, data=data, ci=None)
+    return annotate_sample(ax, len(data), len(df))
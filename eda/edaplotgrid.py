@@ -0,0 +1,126 @@
+import time
+import threading
+import streamlit as st
+from concurrent.futures import as_completed
+
+import poolutil
+import viewutil
+import edaplotdata
+
+LABEL_RENDERING = 'Rendering...'
+# a grid a session stopped rendering (its view was closed, or the session
+# ended) stops counting after this
+SELECTION_MAX_AGE = 300
+
+_futures = {}
+_selections = {}
+_lock = threading.Lock()
+
+
+def get_session_id():
+    try:
+        from streamlit.report_thread import get_report_ctx
+        ctx = get_report_ctx()
+        return ctx.session_id if ctx is not None else None
+    except ImportError:
+        return None
+
+
+def render_plot(plot_name, data, kwargs):
+    # runs in a worker process, so it has to select a non-interactive backend itself
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    plt.figure()
+    try:
+        ax = getattr(edaplotdata, 'plot_' + plot_name)(data, **kwargs)
+        return viewutil.render_figure(ax.get_figure())
+    finally:
+        plt.close('all')
+
+
+def on_plot_done(key, future):
+    with _lock:
+        if _futures.get(key) is future:
+            del _futures[key]
+    if not future.cancelled() and future.exception() is None:
+        viewutil.figure_cache.put(key, future.result())
+
+
+def submit_plot(key, plot_name, data, kwargs):
+    # identical plots requested by several sessions share one job
+    with _lock:
+        future = _futures.get(key)
+        if future is None or future.cancelled():
+            future = poolutil.get_pool(use_processes=True).submit(render_plot, plot_name, data, kwargs)
+            _futures[key] = future
+            future.add_done_callback(lambda f: on_plot_done(key, f))
+    return future
+
+
+def select_plot(grid_id, key):
+    # registered before the plot is submitted, so another session's
+    # cancel_stale_plots never sees it unselected
+    with _lock:
+        selection = (get_session_id(), grid_id)
+        keys, _ = _selections.get(selection, (set(), None))
+        _selections[selection] = (keys | {key}, time.monotonic())
+
+
+def cancel_stale_plots(grid_id, keys):
+    # plots that dropped out of this grid's selection are cancelled unless
+    # another session still shows them; already running ones finish into the cache
+    now = time.monotonic()
+    with _lock:
+        _selections[(get_session_id(), grid_id)] = (set(keys), now)
+        for selection, (_, updated) in list(_selections.items()):
+            if now - updated > SELECTION_MAX_AGE:
+                del _selections[selection]
+        active = set().union(*[selected for selected, _ in _selections.values()])
+        for key, future in list(_futures.items()):
+            if key not in active:
+                future.cancel()
+
+
+class PlotGrid:
+    def __init__(self, grid_id):
+        self.grid_id = grid_id
+        self.keys = []
+        self.pending = {}
+
+    def add(self, df, key, plot_name, **kwargs):
+        self.keys.append(key)
+        placeholder = st.empty()
+        image = viewutil.figure_cache.get(key)
+        if image is not None:
+            placeholder.image(image, use_column_width=True, output_format='PNG')
+            return
+
+        columns = [kwargs.get(col) for col in ['x', 'y', 'hue'] if kwargs.get(col) is not None]
+        # plots of a whole (small) frame, e.g. a heatmap of a correlation matrix, take no columns
+        data = df[columns] if columns else df
+        # only ship the rows the plot can use to the worker
+        if plot_name == 'scatter':
+            data = edaplotdata.sample_rows(data, kwargs.get('budget', edaplotdata.PLOT_POINT_BUDGET), kwargs.get('hue'))
+            kwargs['n_total'] = len(df)
+        elif plot_name == 'swarm':
+            data = edaplotdata.get_swarm_sample(data, kwargs.get('x'), kwargs.get('hue'), kwargs.get('budget', edaplotdata.PLOT_POINT_BUDGET))
+            kwargs['n_total'] = len(df)
+        elif plot_name == 'box' and len(data) > kwargs.get('budget', edaplotdata.PLOT_POINT_BUDGET):
+            # the worker only gets the per-group summaries, not the columns
+            data = edaplotdata.get_box_summary(data, **kwargs)
+            plot_name, kwargs = 'box_summary', {}
+
+        placeholder.text(LABEL_RENDERING)
+        select_plot(self.grid_id, key)
+        self.pending[submit_plot(key, plot_name, data, kwargs)] = placeholder
+
+    def render(self):
+        cancel_stale_plots(self.grid_id, self.keys)
+        for future in as_completed(self.pending):
+            placeholder = self.pending[future]
+            try:
+                placeholder.image(future.result(), use_column_width=True, output_format='PNG')
+            except Exception as e:
+                placeholder.error(e)
@@ -0,0 +1,110 @@
+import os
+import io
+import hmac
+import hashlib
+import secrets
+import joblib
+
+import cacheutil
+
+REGISTRY_DIR = os.environ.get('ACTIVEML_MODEL_DIR', os.path.join(os.path.expanduser('~'), '.activeml', 'models'))
+REGISTRY_MAX_BYTES = int(os.environ.get('ACTIVEML_MODEL_MAX_BYTES', 2 << 30))
+REGISTRY_MAX_MODELS = 32
+
+MODEL_EXTENSION = '.joblib'
+
+# exports are signed with a server-side secret; only files this server (or
+# one sharing its secret) signed are ever unpickled on import
+SECRET_PATH = os.environ.get('ACTIVEML_MODEL_SECRET_PATH', os.path.join(os.path.expanduser('~'), '.activeml', 'model.key'))
+EXPORT_MAGIC = b'ACTIVEML-MODEL-1\n'
+SIGNATURE_SIZE = hashlib.sha256().digest_size
+
+model_cache = cacheutil.LRUCache(REGISTRY_MAX_MODELS)
+
+
+def get_model_key(data_key, feature_columns, prediction_column, algo_type, params, train_size, random_state):
+    return cacheutil.get_hash(data_key, list(feature_columns), prediction_column, algo_type,
+        sorted(params.items()), train_size, random_state)
+
+
+def get_path(key, registry_dir=None):
+    return os.path.join(registry_dir or REGISTRY_DIR, key + MODEL_EXTENSION)
+
+
+def load_model(key, registry_dir=None):
+    entry = model_cache.get(key)
+    if entry is not None:
+        return entry
+    path = get_path(key, registry_dir)
+    if not os.path.isfile(path):
+        return None
+    try:
+        entry = joblib.load(path)
+    except Exception:
+        # a model written by another library version cannot be trusted, refit it
+        return None
+    cacheutil.touch(path)
+    model_cache.put(key, entry)
+    return entry
+
+
+def save_model(key, entry, registry_dir=None, max_bytes=None):
+    model_cache.put(key, entry)
+    registry_dir = registry_dir or REGISTRY_DIR
+    try:
+        os.makedirs(registry_dir, exist_ok=True)
+        # a uuid temp name, so concurrent writers of one key never share a file
+        cacheutil.write_atomic(get_path(key, registry_dir), lambda path: joblib.dump(entry, path))
+    except OSError:
+        return False
+    cacheutil.evict_directory(registry_dir, max_bytes or REGISTRY_MAX_BYTES, keep=[key])
+    return True
+
+
+def get_secret(path=None):
+    secret = os.environ.get('ACTIVEML_MODEL_SECRET')
+    if secret:
+        return secret.encode()
+    path = path or SECRET_PATH
+    try:
+        with open(path, 'rb') as f:
+            return f.read()
+    except FileNotFoundError:
+        pass
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    try:
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:
+        # another session created it first
+        with open(path, 'rb') as f:
+            return f.read()
+    secret = secrets.token_bytes(32)
+    with os.fdopen(fd, 'wb') as f:
+        f.write(secret)
+    return secret
+
+
+def sign(payload, secret=None):
+    return hmac.new(secret or get_secret(), payload, hashlib.sha256).digest()
+
+
+def export_model(entry):
+    buffer = io.BytesIO()
+    joblib.dump(entry, buffer)
+    payload = buffer.getvalue()
+    return EXPORT_MAGIC + sign(payload) + payload
+
+
+def import_model(file):
+    data = bytes(file.getbuffer()) if hasattr(file, 'getbuffer') else file.read()
+    header = len(EXPORT_MAGIC) + SIGNATURE_SIZE
+    if not data.startswith(EXPORT_MAGIC) or len(data) < header:
+        raise ValueError('File is not an exported model')
+    signature, payload = data[len(EXPORT_MAGIC):header], data[header:]
+    # verified before unpickling: loading a forged file would run its code on the server
+    if not hmac.compare_digest(signature, sign(payload)):
+        raise ValueError('Model signature does not match, only models exported by this server can be imported')
+    entry = joblib.load(io.BytesIO(payload))
+    if not isinstance(entry, dict) or 'model' not in entry:
+        raise ValueError('File is not an exported model')
+    return entry
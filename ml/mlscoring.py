@@ -0,0 +1,141 @@
+import os
+import copy
+import time
+import uuid
+import numpy as np
+import pandas as pd
+from collections import deque
+
+import poolutil
+import dataprocessview
+import dataencoder
+import dataremote
+import datapipeline
+
+SCORING_CHUNK_SIZE = 100000
+SCORING_OUTPUT_DIR = os.environ.get('ACTIVEML_OUTPUT_DIR', os.path.join(os.path.expanduser('~'), '.activeml', 'predictions'))
+SCORING_DOWNLOAD_MAX_SIZE = 50 * 1024 * 1024
+PREDICTION_COLUMN = 'prediction'
+
+# steps that drop or renumber rows would misalign predictions with the input rows
+ROW_STEPS = [
+    dataprocessview.LABEL_DROP_NULL_VALUES,
+    dataprocessview.LABEL_DROP_DUPLICATES,
+    dataprocessview.LABEL_RESET_INDEX,
+]
+
+
+def get_source_columns(entry):
+    # the input columns the model's features come from; one-hot encoded
+    # features come from the column they were encoded from
+    features = set(entry['feature_columns'])
+    columns = set(features)
+    for step in entry.get('steps', []):
+        if isinstance(step.fitted, dataencoder.FittedOneHotEncoder):
+            for col in step.fitted.columns:
+                names = features.intersection(step.fitted.get_column_feature_names(col))
+                if names:
+                    columns.difference_update(names)
+                    columns.add(col)
+    columns.discard(entry['prediction_column'])
+    return columns
+
+
+def get_scoring_steps(entry):
+    # The steps recorded at training time select, convert and encode the
+    # prediction column too, which files to score do not have. Replayed for
+    # scoring, they are cut down to the columns the features need.
+    columns = get_source_columns(entry)
+    steps = []
+    for step in entry.get('steps', []):
+        if step.name in ROW_STEPS:
+            continue
+        if step.name == dataprocessview.LABEL_COLUMNS:
+            step = datapipeline.PipelineStep(step.name, step.func,
+                columns=[col for col in step.params['columns'] if col in columns])
+        elif step.name == dataprocessview.LABEL_INFER_TYPES:
+            step = datapipeline.PipelineStep(step.name, step.func,
+                conversions={col: value for col, value in step.params['conversions'].items() if col in columns})
+        elif step.fitted is not None and hasattr(step.fitted, 'columns'):
+            fitted = copy.copy(step.fitted)
+            fitted.columns = [col for col in fitted.columns if col in columns]
+            if not fitted.columns:
+                continue
+            step = copy.copy(step)
+            step.fitted = fitted
+        steps.append(step)
+    return steps
+
+
+def transform_chunk(chunk, entry):
+    # load_data lowercases column names, the recorded steps expect the same;
+    # fitted steps (encoders) replay the levels learned at training time
+    chunk = chunk.rename(lambda x: str(x).lower(), axis='columns')
+    chunk = chunk.drop(columns=[entry['prediction_column']], errors='ignore')
+    # encoded columns always come out of the replayed steps, a missing column is
+    # missing from the input and would otherwise be predicted on as zeros
+    missing = sorted(get_source_columns(entry) - set(chunk.columns), key=str)
+    if len(missing):
+        raise ValueError('Columns required by the model are missing: ' + ', '.join(map(str, missing)))
+    for step in get_scoring_steps(entry):
+        chunk, _ = step.apply(chunk)
+    return chunk[entry['feature_columns']]
+
+
+def predict_chunk(chunk, entry):
+    X = transform_chunk(chunk, entry)
+    complete = X.notna().all(axis=1).to_numpy()
+    predictions = pd.Series(np.nan, index=chunk.index, dtype=object)
+    if complete.any():
+        predictions[complete] = entry['model'].predict(dataencoder.to_model_matrix(X[complete]))
+    return chunk.assign(**{PREDICTION_COLUMN: predictions})
+
+
+def is_source(file):
+    # uploaded files or http(s) URLs, never paths on the server
+    return hasattr(file, 'read') or dataremote.is_url(file)
+
+
+def get_output_path(name):
+    # always a fresh file inside the output dir, whatever the source is called
+    base = os.path.splitext(os.path.basename(str(name).rstrip('/')))[0] or 'data'
+    base = ''.join(c if c.isalnum() or c in '-_' else '_' for c in base)[:64]
+    return os.path.join(SCORING_OUTPUT_DIR, f'{base}-{uuid.uuid4().hex[:8]}-predictions.csv')
+
+
+def score_file(file, entry, sep=',', chunksize=SCORING_CHUNK_SIZE, max_workers=None, on_progress=None):
+    if not is_source(file):
+        raise ValueError('Only uploaded files or http(s) URLs can be scored')
+    max_in_flight = max_workers or poolutil.POOL_MAX_WORKERS
+    pool = poolutil.get_pool(max_workers=max_workers)
+    output_path = get_output_path(getattr(file, 'name', file))
+    os.makedirs(SCORING_OUTPUT_DIR, exist_ok=True)
+
+    start = time.perf_counter()
+    n_rows = 0
+    pending = deque()
+    with open(output_path, 'w', newline='') as output:
+        def write_next():
+            nonlocal n_rows
+            result = pending.popleft().result()
+            result.to_csv(output, header=n_rows == 0, index=False)
+            n_rows += len(result)
+            if on_progress is not None:
+                on_progress(n_rows, time.perf_counter() - start)
+
+        # chunks are read in order and predicted on the pool; at most one chunk
+        # per worker is in flight, which bounds memory regardless of file size
+        for chunk in pd.read_csv(file, sep=sep, chunksize=chunksize):
+            pending.append(pool.submit(predict_chunk, chunk, entry))
+            if len(pending) >= max_in_flight:
+                write_next()
+        while pending:
+            write_next()
+
+    seconds = time.perf_counter() - start
+    return {
+        'rows': n_rows,
+        'seconds': seconds,
+        'rows_per_second': n_rows / seconds if seconds > 0 else float('nan'),
+        'output': output_path,
+    }
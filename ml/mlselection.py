@@ -0,0 +1,135 @@
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from sklearn.feature_selection import mutual_info_classif, mutual_info_regression, chi2
+
+import commonutil
+
+SELECTION_MAX_ROWS = 10000
+# continuous columns go through a k-nearest-neighbour estimate and are far
+# slower to score than indicator columns, so they get smaller blocks
+SELECTION_DENSE_BLOCK_COLUMNS = 4
+SELECTION_SPARSE_BLOCK_COLUMNS = 256
+SELECTION_DEFAULT_K = 20
+SELECTION_RANDOM_STATE = 0
+VARIANCE_THRESHOLD = 0.0
+CORRELATION_THRESHOLD = 0.95
+CORRELATION_MAX_FEATURES = 500
+
+COLUMN_MUTUAL_INFO = 'Mutual Information'
+COLUMN_CHI2 = 'Chi²'
+COLUMN_TARGET_CORRELATION = 'Target Correlation'
+COLUMN_VARIANCE = 'Variance'
+COLUMN_RANK = 'Rank'
+COLUMN_REDUNDANT = 'Redundant With'
+
+
+def get_sample(df, max_rows=SELECTION_MAX_ROWS, random_state=SELECTION_RANDOM_STATE):
+    # the scores only have to order the features, a row sample is enough
+    if len(df) <= max_rows:
+        return df
+    index = np.random.RandomState(random_state).choice(len(df), max_rows, replace=False)
+    return df.iloc[np.sort(index)]
+
+
+def get_blocks(df, columns):
+    sparse_columns = [col for col in columns if commonutil.is_sparse_dtype(df[col].dtype)]
+    dense_columns = [col for col in columns if col not in sparse_columns]
+    size = SELECTION_DENSE_BLOCK_COLUMNS
+    blocks = [(dense_columns[i:i + size], False) for i in range(0, len(dense_columns), size)]
+    size = SELECTION_SPARSE_BLOCK_COLUMNS
+    blocks += [(sparse_columns[i:i + size], True) for i in range(0, len(sparse_columns), size)]
+    return blocks
+
+
+def get_block_matrix(df, columns, sparse):
+    if sparse:
+        return df[columns].sparse.to_coo().tocsc().astype(np.float64)
+    X = df[columns].to_numpy(dtype=np.float64)
+    # scores cannot take missing values, impute the column mean for ranking only
+    missing = np.isnan(X)
+    if missing.any():
+        X = np.where(missing, np.nanmean(X, axis=0), X)
+        X[np.isnan(X)] = 0
+    return X
+
+
+def to_dense(X):
+    return X if isinstance(X, np.ndarray) else X.toarray()
+
+
+def get_variance(X):
+    if isinstance(X, np.ndarray):
+        return X.var(axis=0)
+    mean = np.asarray(X.mean(axis=0)).ravel()
+    return np.asarray(X.multiply(X).mean(axis=0)).ravel() - mean ** 2
+
+
+def get_target_correlation(X, y):
+    X = to_dense(X)
+    X = X - X.mean(axis=0)
+    y = y - y.mean()
+    denominator = np.sqrt((X ** 2).sum(axis=0) * (y ** 2).sum())
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.abs(np.where(denominator > 0, X.T @ y / denominator, 0))
+
+
+def score_block(df, columns, sparse, y, classification, random_state):
+    # one column block, scored in its own worker; df only holds the block's columns
+    X = get_block_matrix(df, columns, sparse)
+    scores = {COLUMN_VARIANCE: get_variance(X)}
+    if classification:
+        # indicator columns are discrete, and sparse input has to be
+        scores[COLUMN_MUTUAL_INFO] = mutual_info_classif(X, y, discrete_features=sparse, random_state=random_state)
+        # chi² is only defined for non-negative features, e.g. counts and indicators
+        chi = np.full(len(columns), np.nan)
+        non_negative = np.asarray(X.min(axis=0).todense() if not isinstance(X, np.ndarray) else X.min(axis=0)).ravel() >= 0
+        if non_negative.any():
+            chi[non_negative] = chi2(X[:, np.flatnonzero(non_negative)], y)[0]
+        scores[COLUMN_CHI2] = chi
+    else:
+        y = y.astype(np.float64)
+        scores[COLUMN_MUTUAL_INFO] = mutual_info_regression(X, y, discrete_features=sparse, random_state=random_state)
+        scores[COLUMN_TARGET_CORRELATION] = get_target_correlation(X, y)
+    return pd.DataFrame(scores, index=columns)
+
+
+def find_redundant(df, ranked, threshold=CORRELATION_THRESHOLD, max_features=CORRELATION_MAX_FEATURES):
+    # walks the best ranked features in order and marks each one that is
+    # correlated above threshold with a better one already kept
+    candidates = ranked[:max_features]
+    X = np.column_stack([to_dense(get_block_matrix(df, [col], commonutil.is_sparse_dtype(df[col].dtype))) for col in candidates])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        corr = np.abs(np.corrcoef(X, rowvar=False)) if len(candidates) > 1 else np.zeros((1, 1))
+    redundant = pd.Series(None, index=ranked, dtype=object)
+    kept = []
+    for i, col in enumerate(candidates):
+        similar = [j for j in kept if corr[i, j] > threshold]
+        if similar:
+            redundant[col] = candidates[similar[0]]
+        else:
+            kept.append(i)
+    return redundant
+
+
+def rank_features(df, feature_columns, prediction_column, classification, random_state=None, n_jobs=-1):
+    random_state = SELECTION_RANDOM_STATE if random_state is None else random_state
+    data = get_sample(df[feature_columns + [prediction_column]].dropna(subset=[prediction_column]), random_state=random_state)
+    columns = [col for col in feature_columns if pd.api.types.is_numeric_dtype(data[col].dtype) or commonutil.is_sparse_dtype(data[col].dtype)]
+    y = data[prediction_column].to_numpy()
+    blocks = get_blocks(data, columns)
+    scores = Parallel(n_jobs=n_jobs if len(blocks) > 1 else 1)(
+        delayed(score_block)(data[block], block, sparse, y, classification, random_state) for block, sparse in blocks)
+    ranking = pd.concat(scores) if scores else pd.DataFrame(columns=[COLUMN_VARIANCE, COLUMN_MUTUAL_INFO])
+
+    # mean rank over the scores a feature has, so no score's scale dominates
+    score_columns = [col for col in [COLUMN_MUTUAL_INFO, COLUMN_CHI2, COLUMN_TARGET_CORRELATION] if col in ranking.columns]
+    ranking[COLUMN_RANK] = ranking[score_columns].rank(ascending=False).mean(axis=1)
+    ranking = ranking.sort_values(COLUMN_RANK)
+    ranking[COLUMN_REDUNDANT] = find_redundant(data, list(ranking.index)) if len(ranking) else None
+    return ranking, len(data)
+
+
+def select_features(ranking, k=SELECTION_DEFAULT_K, variance_threshold=VARIANCE_THRESHOLD):
+    useful = (ranking[COLUMN_VARIANCE] > variance_threshold) & ranking[COLUMN_REDUNDANT].isna()
+    return list(ranking.index[useful][:k])
@@ -0,0 +1,91 @@
+import numpy as np
+import scipy.sparse as sp
+from sklearn.base import BaseEstimator, ClassifierMixin
+from sklearn.linear_model import SGDClassifier
+from sklearn.preprocessing import StandardScaler
+
+import jobutil
+
+SCALABLE_MIN_ROWS = 100000
+SGD_BATCH_SIZE = 50000
+SGD_EPOCHS = 5
+
+ENGINE_EXACT = 'exact'
+ENGINE_SGD = 'mini-batch SGD'
+
+LOSS_HINGE = 'hinge'
+LOSS_LOG = 'log'
+
+
+def get_engine(n_rows, min_rows=SCALABLE_MIN_ROWS):
+    return ENGINE_SGD if n_rows is not None and n_rows >= min_rows else ENGINE_EXACT
+
+
+def get_batch(X, start, stop):
+    return X.iloc[start:stop] if hasattr(X, 'iloc') else X[start:stop]
+
+
+def get_rows(X, index):
+    return X.iloc[index] if hasattr(X, 'iloc') else X[index]
+
+
+def to_array(X):
+    if sp.issparse(X):
+        return X
+    return X.to_numpy(dtype=np.float64) if hasattr(X, 'to_numpy') else np.asarray(X, dtype=np.float64)
+
+
+class MiniBatchSGDClassifier(BaseEstimator, ClassifierMixin):
+    # Linear SVM (hinge) or logistic regression (log) fitted with partial_fit
+    # over mini-batches, so only one batch is ever densified and scaled at a time
+    def __init__(self, loss=LOSS_HINGE, alpha=0.0001, batch_size=SGD_BATCH_SIZE, n_epochs=SGD_EPOCHS, random_state=None):
+        self.loss = loss
+        self.alpha = alpha
+        self.batch_size = batch_size
+        self.n_epochs = n_epochs
+        self.random_state = random_state
+
+    def _get_starts(self, X):
+        return np.arange(0, X.shape[0], self.batch_size)
+
+    def fit(self, X, y):
+        y = np.asarray(y)
+        self.classes_ = np.unique(y)
+        starts = self._get_starts(X)
+
+        self.scaler_ = StandardScaler(with_mean=not sp.issparse(X))
+        for start in starts:
+            self.scaler_.partial_fit(to_array(get_batch(X, start, start + self.batch_size)))
+
+        self.model_ = SGDClassifier(loss=self.loss, alpha=self.alpha, random_state=self.random_state)
+        random_state = np.random.RandomState(self.random_state)
+        for epoch in range(self.n_epochs):
+            for start in random_state.permutation(starts):
+                X_batch = self.scaler_.transform(to_array(get_batch(X, start, start + self.batch_size)))
+                self.model_.partial_fit(X_batch, y[start:start + self.batch_size], classes=self.classes_)
+            jobutil.report((epoch + 1) / self.n_epochs, f'epoch {epoch + 1} of {self.n_epochs}')
+        return self
+
+    def _predict_batches(self, X, method):
+        results = [getattr(self.model_, method)(self.scaler_.transform(to_array(get_batch(X, start, start + self.batch_size))))
+            for start in self._get_starts(X)]
+        return np.concatenate(results) if results else np.empty(0)
+
+    def decision_function(self, X):
+        return self._predict_batches(X, 'decision_function')
+
+    def predict(self, X):
+        return self._predict_batches(X, 'predict')
+
+    def predict_proba(self, X):
+        return self._predict_batches(X, 'predict_proba')
+
+    @property
+    def coef_(self):
+        return self.model_.coef_ / self.scaler_.scale_
+
+    @property
+    def intercept_(self):
+        if not self.scaler_.with_mean:
+            return self.model_.intercept_
+        return self.model_.intercept_ - self.coef_ @ self.scaler_.mean_
@@ -1,12 +1,25 @@
+import os
+import time
 import streamlit as st
+import numpy as np
 import pandas as pd
-from sklearn.model_selection import train_test_split
+import scipy.sparse as sp
+from joblib import Parallel, delayed
+from sklearn.base import clone
+from sklearn.model_selection import train_test_split, KFold, StratifiedKFold
 from sklearn.linear_model import LinearRegression, LogisticRegression
 from sklearn.svm import SVC
 from sklearn.tree import DecisionTreeClassifier
 from sklearn.metrics import confusion_matrix, r2_score
 
 import viewutil
+import cacheutil
+import mlregistry
+import mlsolver
+import mlscoring
+import mlselection
+import dataencoder
+import profileutil
 
 import matplotlib.pyplot as plt
 
@@ -21,6 +34,22 @@ LABEL_R2_SCORE = 'R^2 Score'
 LABEL_CONFUSION_MATRIX = 'Confusion Matrix'
 LABEL_COEFFICIENTS = 'Coefficients'
 LABEL_INTERCEPT = 'Intercept'
+LABEL_COMPARE_MODELS = 'Compare All'
+LABEL_CV_FOLDS = 'Folds'
+LABEL_LEADERBOARD = 'Leaderboard'
+LABEL_EXPORT_MODEL = 'Export Model'
+LABEL_IMPORT_MODEL = 'Import Model'
+LABEL_ENGINE = 'Engine'
+LABEL_BATCH_SCORING = 'Batch Scoring'
+LABEL_SCORING_FILE = 'Upload File to Score'
+LABEL_SCORING_PATH = 'Or URL to Score'
+LABEL_SCORING_DOWNLOAD = 'Download predictions'
+LABEL_RUN_SCORING = 'Score'
+LABEL_FEATURE_SELECTION = 'Rank Features'
+LABEL_FEATURE_RANKING = 'Feature Ranking'
+LABEL_TOP_FEATURES = 'Top Features'
+LABEL_USE_TOP_FEATURES = 'Train on Top Features'
+LABEL_COMPARE_FEATURES = 'Compare Training Time'
 
 ML_TYPE_CLASSIFICATION = 'Classification'
 ML_TYPE_REGRESSION = 'Regression'
@@ -42,7 +71,123 @@ ML_TYPES = {
     ]
 }
 
-def generate_train_view(df, random_state):
+SCALABLE_ALGOS = [
+    ALGO_LOGISTIC_REGRESSION,
+    ALGO_SVM
+]
+
+def get_engine(algo_type, n_rows=None):
+    # libsvm is quadratic to cubic in the rows and lbfgs needs the whole matrix,
+    # large training sets switch to linear models fitted over mini-batches
+    return mlsolver.get_engine(n_rows) if algo_type in SCALABLE_ALGOS else mlsolver.ENGINE_EXACT
+
+def get_model(algo_type, random_state=None, n_rows=None):
+    engine = get_engine(algo_type, n_rows)
+    if algo_type == ALGO_LINEAR_REGRESSION:
+        return LinearRegression()
+    elif algo_type == ALGO_LOGISTIC_REGRESSION:
+        if engine == mlsolver.ENGINE_SGD:
+            return mlsolver.MiniBatchSGDClassifier(loss=mlsolver.LOSS_LOG, random_state=random_state)
+        return LogisticRegression(solver='lbfgs', multi_class='auto', random_state=random_state)
+    elif algo_type == ALGO_SVM:
+        if engine == mlsolver.ENGINE_SGD:
+            return mlsolver.MiniBatchSGDClassifier(loss=mlsolver.LOSS_HINGE, random_state=random_state)
+        return SVC(kernel='linear', random_state=random_state)
+    elif algo_type == ALGO_DECISION_TREE_CLASSIFIER:
+        return DecisionTreeClassifier(criterion='entropy')
+    return None
+
+def fit_and_score(algo_type, model, X, y, train, test):
+    X_train, X_test = mlsolver.get_rows(X, train), mlsolver.get_rows(X, test)
+    y_train, y_test = y.iloc[train], y.iloc[test]
+    start = time.perf_counter()
+    model.fit(X_train, y_train)
+    fit_time = time.perf_counter() - start
+    start = time.perf_counter()
+    score = model.score(X_test, y_test)
+    score_time = time.perf_counter() - start
+    return algo_type, score, fit_time, score_time
+
+def compare_models(X, y, ml_type, n_folds=5, random_state=None, n_jobs=-1):
+    shuffle_kwargs = {'shuffle': True, 'random_state': random_state}
+    cv = StratifiedKFold(n_folds, **shuffle_kwargs) if ml_type == ML_TYPE_CLASSIFICATION else KFold(n_folds, **shuffle_kwargs)
+    folds = list(cv.split(X, y))
+    n_rows = len(folds[0][0])
+    # every (algorithm, fold) pair is an independent job, so all cores stay busy
+    # even when one algorithm is much slower than the others
+    results = Parallel(n_jobs=n_jobs)(
+        delayed(fit_and_score)(algo_type, clone(get_model(algo_type, random_state, n_rows)), X, y, train, test)
+        for algo_type in ML_TYPES[ml_type] for train, test in folds)
+
+    results = pd.DataFrame(results, columns=['Algorithm', 'Score', 'Fit Time (s)', 'Predict Time (s)'])
+    leaderboard = results.groupby('Algorithm').agg(**{
+        'Mean Score': ('Score', 'mean'),
+        'Std Score': ('Score', 'std'),
+        'Fit Time (s)': ('Fit Time (s)', 'mean'),
+        'Predict Time (s)': ('Predict Time (s)', 'mean'),
+    })
+    return leaderboard.sort_values('Mean Score', ascending=False)
+
+def compare_feature_sets(df, ml_type, algo_type, feature_sets, prediction_column, train_size, random_state=None):
+    # every set is fitted on the same split, so the scores differ only by the features
+    train, test = train_test_split(np.arange(len(df)), train_size=train_size / 100, random_state=random_state)
+    y = df[prediction_column]
+    results = []
+    for name, columns in feature_sets.items():
+        X = dataencoder.to_model_matrix(df[columns])
+        model = get_model(algo_type, random_state, len(train))
+        _, score, fit_time, score_time = fit_and_score(algo_type, model, X, y, train, test)
+        results.append((name, len(columns), score, fit_time, score_time))
+    return pd.DataFrame(results, columns=['Features', 'Count', 'Score', 'Fit Time (s)', 'Predict Time (s)']).set_index('Features')
+
+def split_data(df, feature_columns, prediction_column, train_size, random_state=None):
+    # one-hot columns reach the models as a single sparse matrix
+    X = dataencoder.to_model_matrix(df[feature_columns])
+    return train_test_split(X, df[prediction_column], train_size=train_size / 100, random_state=random_state)
+
+def train_model(df, ml_type, algo_type, feature_columns, prediction_column, train_size, random_state=None, steps=None, split=None):
+    X_train, X_test, y_train, y_test = split or split_data(df, feature_columns, prediction_column, train_size, random_state)
+    model = get_model(algo_type, random_state, X_train.shape[0])
+
+    entry = None
+    # without a seed every rerun draws a different split, so a stored
+    # model could have been trained on the current test rows
+    if random_state is not None:
+        model_key = mlregistry.get_model_key(cacheutil.get_frame_hash(df), feature_columns, prediction_column,
+            algo_type, model.get_params(), train_size, random_state)
+        entry = mlregistry.load_model(model_key)
+
+    if entry is None:
+        with profileutil.stage('model.fit'):
+            model.fit(X_train, y_train)
+        entry = {
+            'model': model,
+            'ml_type': ml_type,
+            'algorithm': algo_type,
+            'feature_columns': feature_columns,
+            'prediction_column': prediction_column,
+            'score': model.score(X_test, y_test),
+            'steps': steps or [],
+        }
+        if random_state is not None:
+            mlregistry.save_model(model_key, entry)
+    return entry
+
+def train_and_evaluate(df, ml_type, algo_type, feature_columns, prediction_column, train_size, random_state=None, steps=None):
+    # runs as a background job; only the model and the small evaluation
+    # outputs are kept with the job, not the split matrices
+    X_train, X_test, y_train, y_test = split_data(df, feature_columns, prediction_column, train_size, random_state)
+    entry = train_model(df, ml_type, algo_type, feature_columns, prediction_column, train_size, random_state,
+        steps, (X_train, X_test, y_train, y_test))
+    evaluation = {
+        'n_train': X_train.shape[0],
+        'y_test': y_test,
+        'y_pred': entry['model'].predict(X_test),
+        'X_test': X_test if X_test.shape[1] == 1 and not sp.issparse(X_test) else None,
+    }
+    return entry, evaluation
+
+def generate_train_view(df, random_state, steps=None):
     columns = list(df.columns)
     
     col1, col2 = st.beta_columns(2)
@@ -55,25 +200,41 @@ def generate_train_view(df, random_state):
     prediction_column = st.selectbox(LABEL_PREDICTION_COLUMN, list(set(columns) - set(feature_columns)), 0)
     train_size = st.slider(LABEL_TRAIN_SIZE, min_value=5, max_value=95, value=70, step=5)
 
+    if len(feature_columns) > 1 and len(prediction_column) and st.checkbox(LABEL_FEATURE_SELECTION):
+        feature_columns = generate_feature_selection_view(df, ml_type, algo_type, feature_columns, prediction_column,
+            train_size, random_state)
+
+    if len(feature_columns) and len(prediction_column) and st.checkbox(LABEL_COMPARE_MODELS):
+        n_folds = st.slider(LABEL_CV_FOLDS, min_value=2, max_value=10, value=5)
+        try:
+            with profileutil.stage('compare_models'):
+                job_key = viewutil.get_view_key(df, 'compare_models', feature_columns, prediction_column, ml_type, n_folds, random_state)
+                leaderboard = viewutil.run_job(job_key, LABEL_COMPARE_MODELS, lambda: compare_models(
+                    dataencoder.to_model_matrix(df[feature_columns]), df[prediction_column], ml_type, n_folds, random_state))
+            viewutil.section_title(LABEL_LEADERBOARD)
+            st.write(leaderboard)
+        except Exception as e:
+            st.error(e)
+
     if len(feature_columns) and len(prediction_column) and st.checkbox(LABEL_TRAIN_MODEL):
-        model = None
-        X_train, X_test, y_train, y_test = train_test_split(df[feature_columns], df[prediction_column], train_size = train_size / 100, random_state = random_state)
-        if algo_type == ALGO_LINEAR_REGRESSION:
-            model = LinearRegression()
-        elif algo_type == ALGO_LOGISTIC_REGRESSION:
-            model = LogisticRegression(solver='lbfgs', multi_class='auto', random_state=random_state)
-        elif algo_type == ALGO_SVM:
-            model = SVC(kernel='linear', random_state=random_state)
-        elif algo_type == ALGO_DECISION_TREE_CLASSIFIER:
-            model = DecisionTreeClassifier(criterion='entropy')
-
-        if model is not None:
+        if get_model(algo_type) is not None:
             try:
-                model.fit(X_train, y_train)
-                y_pred = model.predict(X_test)
+                # fitting runs outside the rerun cycle: widget changes no longer
+                # throw it away, and the next run attaches to the same job
+                job_key = viewutil.get_view_key(df, 'train', ml_type, algo_type, feature_columns, prediction_column,
+                    train_size, random_state)
+                entry, evaluation = viewutil.run_job(job_key, f'{LABEL_TRAIN_MODEL}: {algo_type}', train_and_evaluate,
+                    df, ml_type, algo_type, feature_columns, prediction_column, train_size, random_state, steps)
+                model = entry['model']
+                y_test, y_pred = evaluation['y_test'], evaluation['y_pred']
             
-                score = model.score(X_test, y_test)
+                score = entry['score']
                 st.info('Accuracy: **' + str(round(score * 100, 2)) + '%**')
+                st.write(f'{LABEL_ENGINE}: {get_engine(algo_type, evaluation["n_train"])} ({type(model).__name__})')
+                if st.checkbox(LABEL_EXPORT_MODEL):
+                    viewutil.st_download_link(mlregistry.export_model(entry), f'{algo_type}.joblib', f'{algo_type}.joblib')
+
+                generate_scoring_view(entry, 'trained')
                 
                 if st.checkbox(LABEL_EVALUATION_METRICS):
                     if ml_type == ML_TYPE_REGRESSION:
@@ -86,7 +247,8 @@ def generate_train_view(df, random_state):
                         viewutil.section_title(LABEL_COEFFICIENTS)
                         st.write(model.coef_)
 
-                        if X_test.shape[1] == 1 and len(X_test) == len(y_test):
+                        X_test = evaluation['X_test']
+                        if X_test is not None:
                             plt.scatter(X_test, y_test, color="red")
                             plt.plot(X_test, y_pred, color="green")
                             plt.title("Test Data")
@@ -98,3 +260,91 @@ def generate_train_view(df, random_state):
 
             except Exception as e:
                 st.error(e)
+
+    generate_import_view(df)
+
+def generate_feature_selection_view(df, ml_type, algo_type, feature_columns, prediction_column, train_size, random_state):
+    classification = ml_type == ML_TYPE_CLASSIFICATION
+    try:
+        with profileutil.stage('rank_features'):
+            ranking, n_rows = viewutil.memoize(
+                lambda: mlselection.rank_features(df, feature_columns, prediction_column, classification, random_state),
+                viewutil.get_view_key(df, 'feature_ranking', feature_columns, prediction_column, classification, random_state))
+    except Exception as e:
+        st.error(e)
+        return feature_columns
+
+    viewutil.section_title(LABEL_FEATURE_RANKING)
+    if n_rows < len(df):
+        st.write(f'Scored on a sample of {n_rows:,} rows')
+    st.write(ranking)
+
+    k = st.slider(LABEL_TOP_FEATURES, min_value=1, max_value=len(ranking) or 1,
+        value=min(mlselection.SELECTION_DEFAULT_K, len(ranking) or 1))
+    top = set(mlselection.select_features(ranking, k))
+    selected = [col for col in feature_columns if col in top]
+    st.write(f'{len(selected)} of {len(feature_columns)} features, constant and redundant ones left out')
+
+    if len(selected) and st.checkbox(LABEL_COMPARE_FEATURES):
+        if get_model(algo_type) is None:
+            return feature_columns
+        try:
+            with profileutil.stage('compare_feature_sets'):
+                tradeoff = viewutil.memoize(
+                    lambda: compare_feature_sets(df, ml_type, algo_type, {'All': feature_columns, f'Top {k}': selected},
+                        prediction_column, train_size, random_state),
+                    viewutil.get_view_key(df, 'feature_tradeoff', algo_type, feature_columns, selected, prediction_column,
+                        train_size, random_state))
+            st.write(tradeoff)
+        except Exception as e:
+            st.error(e)
+
+    return selected if len(selected) and st.checkbox(LABEL_USE_TOP_FEATURES) else feature_columns
+
+def generate_import_view(df):
+    file = st.file_uploader(LABEL_IMPORT_MODEL, type=['joblib'])
+    if file is None:
+        return
+    try:
+        entry = mlregistry.import_model(file)
+        st.write({key: value for key, value in entry.items() if key != 'model'})
+        columns = entry['feature_columns'] + [entry['prediction_column']]
+        if all(col in df.columns for col in columns):
+            score = entry['model'].score(dataencoder.to_model_matrix(df[entry['feature_columns']]), df[entry['prediction_column']])
+            st.info('Accuracy on current data: **' + str(round(score * 100, 2)) + '%**')
+    except Exception as e:
+        st.error(e)
+        return
+
+    generate_scoring_view(entry, 'imported')
+
+def generate_scoring_view(entry, key):
+    if not st.checkbox(LABEL_BATCH_SCORING, key=f'{key}_scoring'):
+        return
+    file = st.file_uploader(LABEL_SCORING_FILE, type=['csv', 'tsv', 'txt'], key=f'{key}_scoring_file')
+    path = st.text_input(LABEL_SCORING_PATH, key=f'{key}_scoring_path')
+    source = file if file is not None else (path if len(path) else None)
+    if source is None:
+        return
+
+    if not mlscoring.is_source(source):
+        st.error('Enter an http(s) URL')
+        return
+
+    if st.button(LABEL_RUN_SCORING, key=f'{key}_scoring_run'):
+        progress = st.empty()
+        on_progress = lambda rows, seconds: progress.text(f'{rows:,} rows scored ({rows / max(seconds, 1e-9):,.0f} rows/s)')
+        try:
+            stats = mlscoring.score_file(source, entry, on_progress=on_progress)
+            st.success(f'{stats["rows"]:,} rows scored in {stats["seconds"]:.1f}s '
+                f'({stats["rows_per_second"]:,.0f} rows/s)')
+        except Exception as e:
+            st.error(e)
+            return
+        # predictions are only ever offered for download, never written where the user asks
+        file_name = os.path.basename(stats['output'])
+        if os.path.getsize(stats['output']) <= mlscoring.SCORING_DOWNLOAD_MAX_SIZE:
+            with open(stats['output'], 'rb') as f:
+                viewutil.st_download_link(f.read(), file_name, f'{LABEL_SCORING_DOWNLOAD} ({file_name})')
+        else:
+            st.write(f'Predictions are too large to download here, they are saved as {file_name} in the scoring output directory')
@@ -1,20 +1,29 @@
-from numpy.lib.utils import info
+import os
+import sys
 import streamlit as st
 import pandas as pd
-import numpy as np
-import io
-import matplotlib.pyplot as plt
-import seaborn as sns
 
-import sys
-sys.path = list(set(['eda', 'data', 'ml', 'utils'] + sys.path))
+# the script runs again on every rerun, only add the package dirs once
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+for package in ['eda', 'data', 'ml', 'utils']:
+    path = os.path.join(APP_DIR, package)
+    if path not in sys.path:
+        sys.path.insert(0, path)
 
+# views that need seaborn, sklearn or pydeck import them when first enabled,
+# see profileutil.lazy_import; warm_up preloads them once the page is served
 import dataprocessview
-import edamapview
-import edacustomplot
-import mlsupervised
+import dataingest
+import dataremote
+import datastats
+import datacache
+import edaplotdata
+import edaplotgrid
+import poolutil
 import viewutil
 import commonutil
+import profileutil
+import jobutil
 
 APP_TITLE = "ActiveML"
 APP_ICON = "🔮"
@@ -22,6 +31,8 @@ APP_ICON = "🔮"
 SIDEBAR_GROUP_EDA = "EDA"
 SIDEBAR_GROUP_ML = "ML"
 SIDEBAR_GROUP_SETTINGS = "Settings"
+SIDEBAR_GROUP_PERFORMANCE = "Performance"
+SIDEBAR_GROUP_JOBS = "Jobs"
 
 DATA_VIEW_PROCESS = 'Process Data'
 
@@ -61,6 +72,14 @@ DATA_SOURCES = [
 DATA_MAX_N_ROWS = 100000
 DATA_CSV_SEPERATORS = [',', ';', '', '|', r'\t']
 
+LABEL_STREAM_DATA = 'Stream Large File'
+LABEL_APPROXIMATE_STATS = 'Approximate Statistics'
+LABEL_TRACE_MEMORY = 'Trace Memory'
+LABEL_CAPTURE_PROFILE = 'Capture Profile'
+
+WARM_MODULES = ['seaborn', 'edacustomplot', 'edamapview', 'mlsupervised']
+WARM_WORKER_MODULES = ['edaplotgrid', 'seaborn']
+
 DEMO_DATASETS = {
     '': {
         'url': ''
@@ -84,22 +103,138 @@ DEMO_DATASETS = {
 
 
 
-@st.cache
+def get_download_progress(element):
+    last = {'value': None}
+    def on_progress(n_bytes, total):
+        value = int(100 * n_bytes / total) if total else n_bytes >> 20
+        if value != last['value']:
+            last['value'] = value
+            if total:
+                element.progress(min(value, 100))
+            else:
+                element.text(f'{value} MB downloaded')
+    return on_progress
+
+def read_source(file, read):
+    # URLs are streamed through the download cache, so parsing starts with
+    # the first block and stops the download once nrows are read
+    if not dataremote.is_url(file):
+        return read(file)
+    element = st.empty()
+    try:
+        with dataremote.open_url(file, get_download_progress(element)) as stream:
+            return read(stream)
+    finally:
+        element.empty()
+
+@profileutil.timed('load_data')
 def load_data(file, nrows=None, sep=','):
-    data = pd.read_csv(file, nrows=nrows, sep=sep)
-    lowercase = lambda x: str(x).lower()
-    data.rename(lowercase, axis='columns', inplace=True)
+    key = datacache.get_cache_key(file, nrows, sep)
+    data = datacache.load(key)
+    if data is None:
+        data = read_source(file, lambda source: pd.read_csv(source, nrows=nrows, sep=sep))
+        lowercase = lambda x: str(x).lower()
+        data.rename(lowercase, axis='columns', inplace=True)
+        data = datacache.save(key, data)
     return data
 
+@profileutil.timed('load_data')
+def load_data_chunked(file, nrows=None, sep=',', sketch=False):
+    key = datacache.get_cache_key(file, nrows, sep, LABEL_STREAM_DATA, sketch)
+    cached = datacache.load(key, with_meta=True)
+    if cached is not None:
+        data, summary = cached
+        summary.sample = data
+        return data, summary
+
+    data, summary = read_source(file, lambda source: dataingest.load_data_chunked(source, nrows=nrows, sep=sep, sketch=sketch))
+    lowercase = lambda x: str(x).lower()
+    summary.rename(lowercase)
+    data, summary = datacache.save(key, data, summary)
+    summary.sample = data
+    return data, summary
+
+
+
+@profileutil.timed('basic_stats')
+def get_basic_stats(df, full_summary=None):
+    if full_summary is not None:
+        return {
+            'info': full_summary.info(),
+            'dtypes': full_summary.get_dtypes(),
+            'desc': full_summary.get_describe(),
+            'isnull': full_summary.get_null_counts(),
+            'skew': full_summary.get_skew(),
+            'cov': full_summary.get_cov(),
+            'corr': full_summary.get_corr(),
+            'distinct': full_summary.get_distinct_counts() if full_summary.sketches is not None else None,
+        }
+    stats, isnull = datastats.get_frame_stats(df)
+    info = datastats.get_frame_info(df, isnull)
+    return {
+        'info': info,
+        'dtypes': df.dtypes,
+        'desc': stats.get_describe() if len(stats.columns) else df.describe(),
+        'isnull': isnull,
+        'skew': stats.get_skew(),
+        'cov': stats.get_cov(),
+        'corr': stats.get_corr(),
+        'distinct': None,
+    }
 
+def show_basic_stats(df, basic, full_summary):
+    info, dtypes, desc, isnull = basic['info'], basic['dtypes'], basic['desc'], basic['isnull']
+
+    viewutil.section_title('Info')
+    st.text(info)
+
+    viewutil.section_title('Data Types')
+    dtypes = dtypes.rename('Total')
+    dtypes
+
+    if len(df.columns):
+        viewutil.section_title('Describe')
+        desc = desc.T
+        desc
+
+    viewutil.section_title('Missing Values')
+    isnull = isnull.rename('Total')
+    isnull
+
+    if basic['distinct'] is not None:
+        viewutil.section_title(f'Distinct Values (approximate, ±{full_summary.get_distinct_error():.1%})')
+        distinct = basic['distinct'].rename('Total')
+        distinct
+
+    viewutil.section_title('Skew')
+    skew = basic['skew']
+    skew
+
+    viewutil.section_title('Covariance')
+    cov = basic['cov']
+    cov
+    if len(cov) and st.checkbox('Hitmap', key='cov_hitmap'):
+        grid = edaplotgrid.PlotGrid('cov_heatmap')
+        grid.add(cov, viewutil.get_plot_key(df, 'cov_heatmap'), 'heatmap')
+        grid.render()
+
+    viewutil.section_title('Correlation')
+    corr = basic['corr']
+    corr
+    if len(corr) and st.checkbox('Hitmap', key='corr_hitmap'):
+        grid = edaplotgrid.PlotGrid('corr_heatmap')
+        grid.add(corr, viewutil.get_plot_key(df, 'corr_heatmap'), 'heatmap')
+        grid.render()
 
 def main():
     df = None
+    summary = None
     selected_eda_views = []
     selected_ml_views = []
     categorical_columns = None
     nummeric_columns = None
     random_state = None
+    point_budget = edaplotdata.PLOT_POINT_BUDGET
 
     st.beta_set_page_config(
         page_title=APP_TITLE,
@@ -109,12 +244,20 @@ def main():
 
     st.title(APP_ICON + ' ' + APP_TITLE)
 
+    performance_panel = st.sidebar.beta_expander(SIDEBAR_GROUP_PERFORMANCE, False)
+    with performance_panel:
+        trace_memory = st.checkbox(LABEL_TRACE_MEMORY)
+        capture_profile = st.checkbox(LABEL_CAPTURE_PROFILE)
+    profile = profileutil.start_rerun(edaplotgrid.get_session_id(), trace_memory, capture_profile)
+
     with st.beta_expander("Load Data", True):
         dataset_source = st.selectbox('Data Source', DATA_SOURCES)
         
         file = None
         nrows = DATA_MAX_N_ROWS
         sep = ','
+        stream_data = False
+        sketch = False
 
         if dataset_source == DATA_SOURCE_DEMO:
             dataset_name = st.selectbox('Demo Dataset', list(DEMO_DATASETS.keys()))
@@ -124,9 +267,13 @@ def main():
                 sep = DEMO_DATASETS[dataset_name]['sep']
 
         if dataset_source != DATA_SOURCE_DEMO:
+            stream_data = st.checkbox(LABEL_STREAM_DATA)
+            if stream_data:
+                sketch = st.checkbox(LABEL_APPROXIMATE_STATS)
             col1, col2 = st.beta_columns(2)
             with col1:
-                nrows = st.number_input('Number of Rows', value=nrows)
+                # streaming is for files past DATA_MAX_N_ROWS, so it reads them whole (0) by default
+                nrows = st.number_input('Number of Rows', value=0 if stream_data else nrows)
             with col2:
                 sep = st.selectbox('Sepetator', DATA_CSV_SEPERATORS)
                 sep = sep if len(sep) else ','
@@ -144,16 +291,20 @@ def main():
 
         if file is not None:
             try:
-                df = load_data(file, nrows, sep)
-                viewutil.view_data(df, 'file')
+                if stream_data:
+                    df, summary = load_data_chunked(file, nrows, sep, sketch)
+                    viewutil.view_data(df, 'file', shape=summary.get_shape())
+                else:
+                    df = load_data(file, nrows, sep)
+                    viewutil.view_data(df, 'file')
             except Exception as e:
                 st.error(e)
                 st.stop()
     
     if df is not None and len(df):
         
-        with st.beta_expander(DATA_VIEW_PROCESS):
-            df, categorical_columns, nummeric_columns = dataprocessview.generate_date_process_view(df)
+        with st.beta_expander(DATA_VIEW_PROCESS), profileutil.stage(DATA_VIEW_PROCESS):
+            df, categorical_columns, nummeric_columns, process_steps = dataprocessview.generate_date_process_view(df)
 
         if len(categorical_columns) == 0:
             EDA_VIEWS.remove(EDA_VIEW_CATEGORICAL)
@@ -181,119 +332,156 @@ def main():
         with st.sidebar.beta_expander(SIDEBAR_GROUP_SETTINGS, False):
             if st.checkbox("Random State", True):
                 random_state = st.number_input("Random Seed", 42)
+            point_budget = st.number_input(edaplotdata.LABEL_POINT_BUDGET, 100, 1000000, edaplotdata.PLOT_POINT_BUDGET)
 
         if len(selected_eda_views):
             st.markdown('## Exploratory Data Analysis')
 
+        # sketches answer counts and quantiles over all rows while the views show a sample
+        approx_summary = summary if summary is not None and summary.sketches is not None and summary.matches(df) else None
+
         if EDA_VIEW_BASIC in selected_eda_views:
-            with st.beta_expander(EDA_VIEW_BASIC, True):
-                viewutil.section_title('Info')
-                buffer = io.StringIO()
-                df.info(buf=buffer)
-                st.text(buffer.getvalue())
-
-                viewutil.section_title('Data Types')
-                dtypes = df.dtypes.rename('Total')
-                dtypes
-
-                if len(df.columns):
-                    viewutil.section_title('Describe')
-                    desc = df.describe().T
-                    desc
-
-                viewutil.section_title('Missing Values')
-                isnull = df.isnull().sum().rename('Total')
-                isnull
-
-                viewutil.section_title('Skew')
-                skew = df.skew()
-                skew
-                
-                viewutil.section_title('Covariance')
-                cov = df.cov()
-                cov
-                if len(cov) and st.checkbox('Hitmap', key='cov_hitmap'):
-                    viewutil.st_plot(sns.heatmap(cov, annot=True))
-
-                viewutil.section_title('Correlation')
-                corr = df.corr()
-                corr
-                if len(corr) and st.checkbox('Hitmap', key='corr_hitmap'):
-                    viewutil.st_plot(sns.heatmap(corr, annot=True))
+            with st.beta_expander(EDA_VIEW_BASIC, True), profileutil.stage(EDA_VIEW_BASIC):
+                full_summary = summary if summary is not None and summary.matches(df) else None
+                if full_summary is not None:
+                    st.info(f'Statistics cover all {full_summary.n_rows} rows, plots use a {len(df)} row sample')
+                # the full covariance and correlation of a wide frame take a while,
+                # they are computed as a job that survives widget changes
+                basic_key = viewutil.get_view_key(df, EDA_VIEW_BASIC, full_summary.n_rows if full_summary is not None else None)
+                try:
+                    basic = viewutil.run_job(basic_key, EDA_VIEW_BASIC, get_basic_stats, df, full_summary, pool=jobutil.POOL_SHORT)
+                except Exception as e:
+                    st.error(e)
+                else:
+                    show_basic_stats(df, basic, full_summary)
         
         if EDA_VIEW_CATEGORICAL in selected_eda_views:
-            with st.beta_expander(EDA_VIEW_CATEGORICAL, True):
+            with st.beta_expander(EDA_VIEW_CATEGORICAL, True), profileutil.stage(EDA_VIEW_CATEGORICAL):
                 selected_columns = st.multiselect('Columns', categorical_columns, key='cat_col')
                 for col in selected_columns:
                     viewutil.section_title(col)
                     col1, col2 = st.beta_columns(2)
                     with col1:
-                        count = df[col].value_counts()
+                        if approx_summary is not None:
+                            count, error = approx_summary.get_value_counts(col)
+                            st.write(f'Approximate over {approx_summary.n_rows:,} rows, each count is at most {error:,} low')
+                        else:
+                            count = viewutil.memoize(lambda: df[col].value_counts(), viewutil.get_view_key(df, 'value_counts', col))
                         count
 
                     with col2:
-                        viewutil.st_plot(sns.countplot(df[col]))
+                        viewutil.st_plot(lambda: edaplotdata.plot_count(df[col], count), viewutil.get_plot_key(df, 'count', col, approx_summary is not None))
 
         if EDA_VIEW_NUMERICAL in selected_eda_views:
-            with st.beta_expander(EDA_VIEW_NUMERICAL, True):
+            with st.beta_expander(EDA_VIEW_NUMERICAL, True), profileutil.stage(EDA_VIEW_NUMERICAL):
                 selected_columns = st.multiselect('Columns', nummeric_columns, key='num_col')
                 for col in selected_columns:
                     viewutil.section_title(col)
                     col1, col2 = st.beta_columns(2)
                     with col1:
-                        desc = df[col].describe()
+                        if approx_summary is not None:
+                            desc = viewutil.memoize(approx_summary.get_describe, viewutil.get_view_key(df, 'describe', approx_summary.n_rows))[col]
+                            st.write(f'Quantiles approximate, rank error ±{approx_summary.get_quantile_error():.1%}')
+                        else:
+                            desc = viewutil.memoize(lambda: df[col].describe(), viewutil.get_view_key(df, 'describe', col))
                         desc
                     with col2:
                         try:
-                            viewutil.st_plot(sns.distplot(df[col]))
+                            viewutil.st_plot(lambda: edaplotdata.plot_dist(df[col], point_budget), viewutil.get_plot_key(df, 'dist', col, point_budget))
                         except Exception as e:
                             st.error(e)
 
         if EDA_VIEW_BIVARIATE in selected_eda_views:
-            with st.beta_expander(EDA_VIEW_BIVARIATE, True):
+            with st.beta_expander(EDA_VIEW_BIVARIATE, True), profileutil.stage(EDA_VIEW_BIVARIATE):
                 selected_cat_columns = st.multiselect('X', categorical_columns, key='bi_cat_col')
                 selected_num_columns = st.multiselect('Y', nummeric_columns, key='bi_num_col')
+                grid = edaplotgrid.PlotGrid(EDA_VIEW_BIVARIATE)
                 for cat_col in selected_cat_columns:
                     for num_col in selected_num_columns:
                         if cat_col != num_col:
                             col1, col2 = st.beta_columns(2)
                             with col1:
-                                desc = df[num_col].describe()
+                                desc = viewutil.memoize(lambda: df[num_col].describe(), viewutil.get_view_key(df, 'describe', num_col))
                                 desc
                             
                             with col2:
-                                viewutil.st_plot(sns.swarmplot(x=df[cat_col], y=df[num_col]))
+                                grid.add(df, viewutil.get_plot_key(df, 'swarm', cat_col, num_col, point_budget),
+                                    'swarm', x=cat_col, y=num_col, budget=point_budget)
 
                 for cat_col in selected_cat_columns:
                     for num_col in selected_num_columns:
                         if cat_col != num_col:
-                            viewutil.st_plot(sns.boxplot(x=df[cat_col], y=df[num_col]))
+                            grid.add(df, viewutil.get_plot_key(df, 'box', cat_col, num_col, point_budget),
+                                'box', x=cat_col, y=num_col, budget=point_budget)
+                grid.render()
 
         if EDA_VIEW_MULTIVARIATE in selected_eda_views:
-            with st.beta_expander(EDA_VIEW_MULTIVARIATE, True):
+            with st.beta_expander(EDA_VIEW_MULTIVARIATE, True), profileutil.stage(EDA_VIEW_MULTIVARIATE):
                 selected_x_columns = st.multiselect('X', nummeric_columns, key='mul_num_col')
                 selected_y_columns = st.multiselect('Y', nummeric_columns, key='mul_num_col')
                 selected_hue_columns = st.multiselect('Hue', categorical_columns, key='mul_cat_col')
                 
+                grid = edaplotgrid.PlotGrid(EDA_VIEW_MULTIVARIATE)
                 for x in selected_x_columns:
                     for y in selected_y_columns:
                         if x != y:
                             for z in selected_hue_columns:
-                                viewutil.st_plot(sns.scatterplot(df[x], df[y], df[z]))
+                                grid.add(df, viewutil.get_plot_key(df, 'scatter', x, y, z, point_budget),
+                                    'scatter', x=x, y=y, hue=z, budget=point_budget)
+                grid.render()
 
         if EDA_VIEW_MAP in selected_eda_views:
-            with st.beta_expander(EDA_VIEW_MAP, True):
-                edamapview.generate_map_view(df)
+            with st.beta_expander(EDA_VIEW_MAP, True), profileutil.stage(EDA_VIEW_MAP):
+                profileutil.lazy_import('edamapview').generate_map_view(df)
 
         if EDA_VIEW_CUSTOM_PLOT in selected_eda_views:
-            with st.beta_expander(EDA_VIEW_CUSTOM_PLOT, True):
-                edacustomplot.generate_plot_view(df)
+            with st.beta_expander(EDA_VIEW_CUSTOM_PLOT, True), profileutil.stage(EDA_VIEW_CUSTOM_PLOT):
+                profileutil.lazy_import('edacustomplot').generate_plot_view(df, point_budget)
 
         if len(selected_ml_views):
             st.markdown('## Machine Learning')
 
         if ML_VIEW_SUPERVISED in selected_ml_views:
-            with st.beta_expander(ML_VIEW_SUPERVISED, True):
-                mlsupervised.generate_train_view(df, random_state)
-
-main()
\ No newline at end of file
+            with st.beta_expander(ML_VIEW_SUPERVISED, True), profileutil.stage(ML_VIEW_SUPERVISED):
+                profileutil.lazy_import('mlsupervised').generate_train_view(df, random_state, process_steps)
+
+    result = profileutil.finish_rerun()
+    with performance_panel:
+        show_performance(result, profile)
+
+    with st.sidebar.beta_expander(SIDEBAR_GROUP_JOBS, False):
+        show_jobs()
+
+    poolutil.warm_up(WARM_MODULES, WARM_WORKER_MODULES)
+
+def show_jobs():
+    # every session's jobs, so a user sees work another session already started
+    jobs = pd.DataFrame(jobutil.get_table(), columns=['name', 'status', 'progress', 'elapsed', 'requests', 'error'])
+    if not len(jobs):
+        st.write('No jobs')
+        return
+    jobs['progress'] = jobs['progress'].map(lambda x: f'{x:.0%}' if pd.notnull(x) else '')
+    jobs['elapsed'] = jobs['elapsed'].map(lambda x: f'{x:.1f}s')
+    st.table(jobs.fillna(''))
+
+def show_performance(result, profile):
+    st.write(f'Rerun: {result["wall"]:.3f}s wall, {result["cpu"]:.3f}s CPU')
+    if result['process_peak_bytes'] is not None:
+        # tracemalloc is one tracer for the whole server, shared by all sessions
+        st.write(f'Traced peak (process-wide, all sessions): {datastats.format_bytes(result["process_peak_bytes"])}')
+    stages = pd.DataFrame(result['stages'], columns=['stage', 'calls', 'wall', 'cpu', 'net_bytes'])
+    if len(stages):
+        format_net = lambda x: ('-' if x < 0 else '') + datastats.format_bytes(abs(x))
+        stages['net_bytes'] = stages['net_bytes'].map(lambda x: format_net(x) if pd.notnull(x) else '')
+        st.table(stages.set_index('stage').rename(columns={'net_bytes': 'net bytes (process-wide)'}))
+    n_shared, shared_bytes = datacache.get_shared_stats()
+    st.write(f'Shared datasets: {n_shared}, {datastats.format_bytes(shared_bytes)}')
+    if profile.stats is not None:
+        viewutil.st_download_link(profile.get_profile_data(), 'rerun.prof', 'Download profile (.prof)')
+        viewutil.st_download_link(profile.get_profile_text().encode(), 'rerun.txt', 'Download profile (.txt)')
+
+try:
+    main()
+finally:
+    # st.stop() and errors end the script early, never leave a profiler running
+    profileutil.finish_rerun()
\ No newline at end of file
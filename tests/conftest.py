@@ -0,0 +1,9 @@
+import os
+import sys
+
+# the modules import each other flat, the same way streamlit_app.py sets them up
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for package in ['eda', 'data', 'ml', 'utils']:
+    path = os.path.join(ROOT_DIR, package)
+    if path not in sys.path:
+        sys.path.insert(0, path)
@@ -0,0 +1,41 @@
+import os
+import numpy as np
+import pandas as pd
+
+import cacheutil
+
+
+def test_frame_size_counts_object_values():
+    n_rows = 50000
+    df = pd.DataFrame({
+        'text': pd.Series([f'value-{i:08d}' for i in range(n_rows)], dtype=object),
+        'number': np.arange(n_rows),
+    })
+    deep = int(df.memory_usage(index=True, deep=True).sum())
+    assert abs(cacheutil.get_frame_size(df) - deep) < 0.05 * deep
+    assert abs(cacheutil.get_object_size(df['text']) - df['text'].memory_usage(deep=True)) < 0.05 * deep
+
+
+def test_frame_size_without_object_columns():
+    df = pd.DataFrame({'number': np.arange(1000.0)})
+    assert cacheutil.get_frame_size(df) == int(df.memory_usage(index=True, deep=False).sum())
+    assert cacheutil.get_frame_size(df.iloc[:0]) == int(df.iloc[:0].memory_usage(index=True).sum())
+
+
+def write_file(path, size, mtime):
+    with open(path, 'wb') as f:
+        f.write(b'x' * size)
+    os.utime(path, (mtime, mtime))
+
+
+def test_evict_directory_removes_data_and_metadata_together(tmp_path):
+    write_file(tmp_path / 'old.arrow', 100, 1000)
+    write_file(tmp_path / 'old.pkl', 10, 3000)
+    write_file(tmp_path / 'new.arrow', 100, 2000)
+    write_file(tmp_path / 'new.pkl', 10, 2000)
+    write_file(tmp_path / 'kept.arrow', 100, 500)
+
+    # old.pkl was read last, so the 'old' pair is newer than the 'new' one
+    total = cacheutil.evict_directory(str(tmp_path), 250, keep=['kept'])
+    assert sorted(os.listdir(tmp_path)) == ['kept.arrow', 'old.arrow', 'old.pkl']
+    assert total == 210
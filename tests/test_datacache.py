@@ -0,0 +1,72 @@
+import io
+
+import numpy as np
+import pandas as pd
+
+import datacache
+
+
+class Upload(io.BytesIO):
+    def __init__(self, upload_id, name, data):
+        super().__init__(data)
+        self.id = upload_id
+        self.name = name
+
+
+def test_upload_hash_is_memoized_by_upload(monkeypatch):
+    reads = []
+    get_content_hash = datacache.cacheutil.get_content_hash
+    monkeypatch.setattr(datacache.cacheutil, 'get_content_hash', lambda file: reads.append(file) or get_content_hash(file))
+
+    first = datacache.get_source_hash(Upload('upload-1', 'a.csv', b'a,b\n1,2\n'))
+    assert datacache.get_source_hash(Upload('upload-1', 'a.csv', b'a,b\n1,2\n')) == first
+    assert len(reads) == 1
+    # another upload of the same content gets the same key
+    assert datacache.get_source_hash(Upload('upload-2', 'b.csv', b'a,b\n1,2\n')) == first
+    assert datacache.get_source_hash(Upload('upload-3', 'a.csv', b'a,b\n1,3\n')) != first
+    assert len(reads) == 3
+
+
+
+def test_unversioned_url_is_keyed_by_age(monkeypatch):
+    url = 'http://example.com/data.csv'
+    monkeypatch.setattr(datacache.dataremote, 'get_version', lambda url: None)
+    monkeypatch.setattr(datacache.time, 'time', lambda: 1000.0)
+    first = datacache.get_cache_key(url, 100, ',')
+    assert first is not None
+    assert datacache.get_cache_key(url, 100, ',') == first
+    monkeypatch.setattr(datacache.time, 'time', lambda: 1000.0 + datacache.UNVERSIONED_MAX_AGE)
+    assert datacache.get_cache_key(url, 100, ',') != first
+
+
+def get_column_arrays(df):
+    return [df[col].to_numpy() for col in df.columns]
+
+
+def assert_still_mapped(df, arrays):
+    # every column still a view of the mapped read-only arrays, nothing copied or merged
+    assert all(any(np.shares_memory(current, array) for array in arrays) for current in get_column_arrays(df))
+    assert not any(array.flags.writeable for array in get_column_arrays(df))
+
+
+def test_shared_frame_stays_mapped_after_column_selection(tmp_path):
+    data = pd.DataFrame({name: np.arange(1000, dtype=np.float64) * i for i, name in enumerate('abcd')})
+    shared = datacache.save('frame', data, cache_dir=str(tmp_path))
+    assert datacache.is_shared(shared)
+    arrays = get_column_arrays(shared)
+
+    # what select_columns does with a shared frame
+    selected = shared.copy(deep=False)
+    del selected['b']
+    datacache.mark_consolidated(selected)
+    moved = datacache.shallow_copy(shared)
+    moved.index = pd.RangeIndex(1, len(moved) + 1)
+    # take and column selection consolidate the frame in place first in pandas 1.x
+    for df in [shared, selected, moved]:
+        df[['d', 'a']]
+        df.take([0, 1])
+
+    assert_still_mapped(shared, arrays)
+    assert_still_mapped(selected, arrays)
+    assert_still_mapped(moved, arrays)
+    assert datacache.load('frame', cache_dir=str(tmp_path)) is shared
@@ -0,0 +1,37 @@
+import numpy as np
+import pandas as pd
+
+import commonutil
+import dataencoder
+
+
+def test_one_hot_other_level_joins_the_bucket():
+    levels = ['other'] * 5 + ['a'] * 4 + ['b'] * 3 + ['c'] * 2 + ['d'] + [np.nan]
+    df = pd.DataFrame({'x': levels, 'y': range(len(levels))})
+    encoder = dataencoder.FittedOneHotEncoder(max_categories=3)
+    encoded = encoder.fit_transform(df, ['x'])
+
+    names = encoder.get_feature_names()
+    assert len(names) == len(set(names))
+    assert names == ['x_a', 'x_b', 'x_other']
+    X = dataencoder.to_model_matrix(encoded)
+    assert X.shape == (len(df), 4)
+
+    dense = commonutil.to_dense_frame(encoded)
+    assert dense['x_other'].tolist() == [1] * 5 + [0] * 7 + [1, 1, 1, 0]
+    assert dense[['x_a', 'x_b', 'x_other']].sum(axis=1).tolist() == [1] * 15 + [0]
+
+
+def test_one_hot_other_level_without_bucket():
+    df = pd.DataFrame({'x': ['other', 'a', 'a']})
+    encoder = dataencoder.FittedOneHotEncoder(max_categories=3)
+    dense = commonutil.to_dense_frame(encoder.fit_transform(df, ['x']))
+    assert sorted(dense.columns) == ['x_a', 'x_other']
+    assert dense['x_other'].tolist() == [1, 0, 0]
+
+
+def test_one_hot_unseen_levels():
+    train = pd.DataFrame({'x': list('aabbc')})
+    encoder = dataencoder.FittedOneHotEncoder(max_categories=2).fit(train, ['x'])
+    dense = commonutil.to_dense_frame(encoder.transform(pd.DataFrame({'x': ['a', 'z', 'other']})))
+    assert dense.to_dict('list') == {'x_a': [1, 0, 0], 'x_other': [0, 1, 1]}
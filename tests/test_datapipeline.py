@@ -0,0 +1,28 @@
+import numpy as np
+import pandas as pd
+
+import cacheutil
+import datapipeline
+
+
+def test_unchanged_frames_are_counted_once():
+    df = pd.DataFrame({'a': np.arange(10000.0), 'b': np.arange(10000.0)})
+    calls = []
+
+    def unchanged(df):
+        calls.append('unchanged')
+        return df, []
+
+    def doubled(df):
+        calls.append('doubled')
+        return df * 2, []
+    steps = [datapipeline.PipelineStep(f'step {i}', unchanged) for i in range(4)]
+    steps.append(datapipeline.PipelineStep('doubled', doubled))
+    cache = cacheutil.LRUCache(int(2.5 * cacheutil.get_frame_size(df)), datapipeline.get_entry_size)
+
+    first, _, _ = datapipeline.run_pipeline(df, steps, cache=cache)
+    second, _, _ = datapipeline.run_pipeline(df, steps, cache=cache)
+    assert second is first
+    assert len(calls) == 5
+    # only the doubled frame; the input is held by the caller
+    assert cache.size == cacheutil.get_frame_size(df)
@@ -0,0 +1,123 @@
+import gzip
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import dataremote
+
+BODY = b''.join(b'%d,%d\n' % (i, i * i) for i in range(400000))
+
+
+class Handler(BaseHTTPRequestHandler):
+    # serves the server's body with an ETag, Range/If-Range and 304 support,
+    # and records the headers of every GET
+    def do_HEAD(self):
+        self.send_response(200)
+        self.send_header('ETag', self.server.etag)
+        self.end_headers()
+
+    def do_GET(self):
+        server = self.server
+        server.requests.append(dict(self.headers))
+        if self.headers.get('If-None-Match') == server.etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        body = gzip.compress(server.body) if server.encoded else server.body
+        start = 0
+        byte_range = self.headers.get('Range')
+        if byte_range and self.headers.get('If-Range') == server.etag and not server.encoded:
+            start = int(byte_range.split('=')[1].rstrip('-'))
+            self.send_response(206)
+            self.send_header('Content-Range', f'bytes {start}-{len(body) - 1}/{len(body)}')
+        else:
+            self.send_response(200)
+        if server.encoded:
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('ETag', server.etag)
+        self.send_header('Content-Length', str(len(body) - start))
+        self.end_headers()
+        try:
+            self.wfile.write(body[start:])
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.body = BODY
+    server.etag = '"v1"'
+    server.encoded = False
+    server.requests = []
+    server.url = f'http://127.0.0.1:{server.server_address[1]}/data.csv'
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def read_all(url, cache_dir):
+    with dataremote.open_url(url, cache_dir=cache_dir) as stream:
+        return stream.read()
+
+
+def read_some(url, cache_dir):
+    with dataremote.open_url(url, cache_dir=cache_dir) as stream:
+        return stream.read(10)
+
+
+def test_partial_read_is_resumed(server, tmp_path):
+    assert read_some(server.url, tmp_path) == BODY[:10]
+    assert read_all(server.url, tmp_path) == BODY
+    assert 'Range' not in server.requests[0]
+    assert server.requests[1]['Range'].startswith('bytes=')
+    assert server.requests[1]['Range'] != 'bytes=0-'
+
+
+def test_complete_copy_is_revalidated(server, tmp_path):
+    assert read_all(server.url, tmp_path) == BODY
+    assert read_all(server.url, tmp_path) == BODY
+    assert server.requests[1]['If-None-Match'] == '"v1"'
+
+    server.body = BODY[::-1]
+    server.etag = '"v2"'
+    assert read_all(server.url, tmp_path) == BODY[::-1]
+
+
+def test_encoded_response_is_not_resumed(server, tmp_path):
+    server.encoded = True
+    assert read_some(server.url, tmp_path) == BODY[:10]
+    assert read_all(server.url, tmp_path) == BODY
+    assert 'Range' not in server.requests[1]
+
+
+def test_concurrent_first_reads(server, tmp_path):
+    results, errors = [], []
+
+    def fetch():
+        try:
+            results.append(read_all(server.url, tmp_path))
+        except Exception as e:
+            errors.append(e)
+    threads = [threading.Thread(target=fetch) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert results == [BODY] * 8
+    # one download, the other readers revalidated the finished copy
+    assert sum('If-None-Match' not in request for request in server.requests) == 1
+
+
+def test_version_follows_the_server(server, tmp_path, monkeypatch):
+    monkeypatch.setattr(dataremote, 'REMOTE_VERSION_SECONDS', 0)
+    assert dataremote.get_version(server.url, tmp_path) == '"v1"'
+    server.etag = '"v2"'
+    assert dataremote.get_version(server.url, tmp_path) == '"v2"'
@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import datasketch
+
+N_ROWS = 200000
+N_CHUNKS = 8
+
+
+def split(values):
+    # consecutive chunks, the way the file is read
+    size = len(values) // N_CHUNKS
+    return [values[start:start + size] for start in range(0, len(values), size)]
+
+
+@pytest.mark.parametrize('merged', [False, True])
+def test_quantiles_within_rank_error(merged):
+    values = np.random.default_rng(0).lognormal(0, 1, N_ROWS)
+    if merged:
+        # one sketch per chunk, as parallel ingestion builds them
+        sketches = [datasketch.QuantileSketch().update(chunk) for chunk in split(values)]
+        sketch = sketches[0]
+        for other in sketches[1:]:
+            sketch.merge(other)
+    else:
+        sketch = datasketch.QuantileSketch()
+        for chunk in split(values):
+            sketch.update(chunk)
+    assert sketch.n == N_ROWS
+
+    quantiles = np.linspace(0, 1, 101)
+    estimates = sketch.get_quantiles(quantiles)
+    ranks = np.searchsorted(np.sort(values), estimates, side='right') / N_ROWS
+    assert np.abs(ranks - quantiles).max() <= sketch.get_rank_error()
+    assert estimates[0] == values.min() and estimates[-1] == values.max()
+
+
+def test_heavy_hitters_within_error():
+    values = pd.Series(np.random.default_rng(0).zipf(1.3, N_ROWS))
+    sketches = [datasketch.HeavyHitters(100).update(chunk) for chunk in split(values)]
+    sketch = sketches[0]
+    for other in sketches[1:]:
+        sketch.merge(other)
+    assert sketch.n == N_ROWS
+    assert sketch.error <= N_ROWS / (sketch.size + 1)
+
+    exact = values.value_counts()
+    counts = sketch.get_value_counts().reindex(exact.index, fill_value=0)
+    # lower bounds at most `error` low, so every value above the error is kept
+    assert (counts <= exact).all()
+    assert (counts >= exact - sketch.error).all()
+    assert exact[exact > sketch.error].index.isin(sketch.counts.index).all()
+
+
+@pytest.mark.parametrize('n_distinct', [1000, 100000])
+def test_distinct_count_within_error(n_distinct):
+    values = pd.Series(np.random.default_rng(0).integers(0, n_distinct, N_ROWS * 2))
+    sketches = [datasketch.HyperLogLog().update(chunk) for chunk in split(values)]
+    sketch = sketches[0]
+    for other in sketches[1:]:
+        sketch.merge(other)
+    exact = values.nunique()
+    # three standard errors
+    assert abs(sketch.get_count() - exact) <= 3 * sketch.get_relative_error() * exact
+
+
+def test_distinct_count_ignores_dtype():
+    sketch = datasketch.HyperLogLog()
+    sketch.update(pd.Series([1, 2, 3])).update(pd.Series([1.0, 2.0, np.nan]))
+    assert sketch.get_count() == 3
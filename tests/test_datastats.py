@@ -0,0 +1,59 @@
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import datastats
+
+
+@pytest.fixture
+def df():
+    rng = np.random.default_rng(0)
+    n_rows = 10000
+    df = pd.DataFrame({
+        'a': rng.normal(5, 2, n_rows),
+        'b': rng.exponential(3, n_rows),
+        'c': rng.integers(0, 100, n_rows),
+        'd': rng.normal(0, 1, n_rows) * 1e6 + 1e9,
+        'label': rng.choice(['x', 'y'], n_rows),
+    })
+    df.loc[rng.random(n_rows) < 0.1, 'a'] = np.nan
+    df.loc[rng.random(n_rows) < 0.3, 'b'] = np.nan
+    return df
+
+
+def assert_matches_pandas(stats, df):
+    numeric = df[stats.columns]
+    pd.testing.assert_series_equal(stats.get_mean(), numeric.mean(), check_names=False)
+    pd.testing.assert_series_equal(stats.get_std() ** 2, numeric.var(), check_names=False)
+    pd.testing.assert_series_equal(stats.get_skew(), numeric.skew(), check_names=False)
+    pd.testing.assert_frame_equal(stats.get_cov(), numeric.cov())
+    pd.testing.assert_frame_equal(stats.get_corr(), numeric.corr())
+
+
+def test_blocked_stats_match_pandas(df):
+    # the minimum block size splits the frame into several blocks
+    stats = datastats.DataStats.from_frame_parallel(df, block_bytes=1)
+    assert stats.columns == ['a', 'b', 'c', 'd']
+    assert_matches_pandas(stats, df)
+
+
+def test_frame_stats_match_pandas(df):
+    stats, null_counts = datastats.get_frame_stats(df)
+    assert_matches_pandas(stats, df)
+    pd.testing.assert_frame_equal(stats.get_describe(), df.describe(), check_dtype=False)
+    pd.testing.assert_series_equal(null_counts, df.isnull().sum())
+
+
+def test_frame_stats_memory():
+    n_rows, n_columns = 200000, 10
+    df = pd.DataFrame(np.random.default_rng(0).normal(size=(n_rows, n_columns)))
+    tracemalloc.start()
+    try:
+        datastats.get_frame_stats(df)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    # less than one copy of the numeric data
+    assert peak < n_rows * n_columns * 8
@@ -0,0 +1,58 @@
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip('streamlit')
+
+import dataprocessview
+import mlscoring
+import mlsupervised
+
+
+ENCODERS = {
+    'one_hot': ({'encoder_type': dataprocessview.ENCODER_TYPE_ONE_HOT, 'columns': ['color']},
+        ['x', 'color_red', 'color_green', 'color_blue']),
+    # a label-encoded target is replayed by the same encoder as the features
+    'label': ({'encoder_type': dataprocessview.ENCODER_TYPE_LABEL, 'columns': ['color', 'label']}, ['x', 'color']),
+}
+
+
+@pytest.fixture(params=list(ENCODERS))
+def entry(request):
+    encoder, feature_columns = ENCODERS[request.param]
+    rng = np.random.default_rng(0)
+    n_rows = 400
+    df = pd.DataFrame({
+        'x': rng.normal(size=n_rows),
+        'color': rng.choice(['red', 'green', 'blue'], n_rows),
+        'unused': rng.normal(size=n_rows),
+    })
+    df['label'] = np.where(df['x'] + (df['color'] == 'red') > 0.5, 'yes', 'no')
+    steps = dataprocessview.get_process_steps(['x', 'color', 'label'],
+        operations=[dataprocessview.LABEL_DROP_NULL_VALUES], encoder=encoder)
+    processed, _, _ = dataprocessview.process_data(df, steps)
+    return mlsupervised.train_model(processed, mlsupervised.ML_TYPE_CLASSIFICATION,
+        mlsupervised.ALGO_DECISION_TREE_CLASSIFIER, feature_columns, 'label', 70, steps=steps)
+
+
+def test_score_file_without_label(entry, tmp_path, monkeypatch):
+    monkeypatch.setattr(mlscoring, 'SCORING_OUTPUT_DIR', str(tmp_path))
+    file = io.BytesIO(b'x,color,other\n2.0,red,1\n-3.0,blue,2\n0.1,purple,3\n')
+    file.name = 'new.csv'
+    stats = mlscoring.score_file(file, entry, max_workers=1)
+    scored = pd.read_csv(stats['output'])
+    assert stats['rows'] == 3
+    assert list(scored.columns) == ['x', 'color', 'other', mlscoring.PREDICTION_COLUMN]
+    assert scored[mlscoring.PREDICTION_COLUMN].notna().all()
+
+
+def test_score_chunk_with_label(entry):
+    chunk = pd.DataFrame({'x': [2.0], 'color': ['red'], 'label': ['yes']})
+    assert mlscoring.predict_chunk(chunk, entry)[mlscoring.PREDICTION_COLUMN].notna().all()
+
+
+def test_score_chunk_missing_feature(entry):
+    with pytest.raises(ValueError, match='color'):
+        mlscoring.transform_chunk(pd.DataFrame({'x': [1.0]}), entry)
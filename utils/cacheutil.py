@@ -0,0 +1,212 @@
+import os
+import uuid
+import hashlib
+import threading
+import weakref
+import pandas as pd
+from collections import OrderedDict
+
+HASH_BLOCK_SIZE = 1 << 20
+SIZE_SAMPLE_ROWS = 1000
+
+
+def get_hash(*parts):
+    hasher = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        hasher.update(repr(part).encode())
+        hasher.update(b'\0')
+    return hasher.hexdigest()
+
+
+def get_content_hash(file):
+    hasher = hashlib.blake2b(digest_size=16)
+    if hasattr(file, 'getbuffer'):
+        hasher.update(file.getbuffer())
+    elif hasattr(file, 'read'):
+        position = file.tell()
+        file.seek(0)
+        for block in iter(lambda: file.read(HASH_BLOCK_SIZE), b''):
+            hasher.update(block if isinstance(block, bytes) else block.encode())
+        file.seek(position)
+    else:
+        with open(file, 'rb') as f:
+            for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b''):
+                hasher.update(block)
+    return hasher.hexdigest()
+
+
+_frame_hashes = {}
+
+
+def get_frame_hash(df):
+    # frames served from the dataset cache are the same object across reruns,
+    # so remember their hash for as long as they are alive
+    entry = _frame_hashes.get(id(df))
+    if entry is not None and entry[0]() is df:
+        return entry[1]
+
+    hasher = hashlib.blake2b(digest_size=16)
+    hasher.update(repr(list(df.columns)).encode())
+    hasher.update(repr(list(df.dtypes.astype(str))).encode())
+    hasher.update(pd.util.hash_pandas_object(df, index=True).values.tobytes())
+    frame_hash = hasher.hexdigest()
+
+    key = id(df)
+    _frame_hashes[key] = (weakref.ref(df, lambda _: _frame_hashes.pop(key, None)), frame_hash)
+    return frame_hash
+
+
+def get_object_column_size(values):
+    # deep=False counts only the pointers of object (e.g. string) values; the
+    # objects themselves are measured on an evenly spaced sample and scaled up
+    step = max(len(values) // SIZE_SAMPLE_ROWS, 1)
+    if isinstance(values, pd.Index):
+        sample = values[::step]
+        extra = sample.memory_usage(deep=True) - sample.memory_usage(deep=False)
+    else:
+        sample = values.iloc[::step]
+        extra = sample.memory_usage(index=False, deep=True) - sample.memory_usage(index=False, deep=False)
+    return int(extra * len(values) / max(len(sample), 1))
+
+
+def get_series_size(series):
+    size = int(series.memory_usage(index=True, deep=False))
+    if series.dtype == object:
+        size += get_object_column_size(series)
+    if series.index.dtype == object:
+        size += get_object_column_size(series.index)
+    return size
+
+
+def get_frame_size(df):
+    size = int(df.memory_usage(index=True, deep=False).sum())
+    for i, dtype in enumerate(df.dtypes):
+        if dtype == object:
+            size += get_object_column_size(df.iloc[:, i])
+    if df.index.dtype == object:
+        size += get_object_column_size(df.index)
+    return size
+
+
+def get_object_size(obj):
+    if isinstance(obj, pd.DataFrame):
+        return get_frame_size(obj)
+    if isinstance(obj, pd.Series):
+        return get_series_size(obj)
+    if isinstance(obj, (str, bytes)):
+        return len(obj)
+    if isinstance(obj, dict):
+        return sum(get_object_size(value) for value in obj.values())
+    if isinstance(obj, (list, tuple)):
+        return sum(get_object_size(value) for value in obj)
+    return getattr(obj, 'nbytes', 64)
+
+
+class LRUCache:
+    def __init__(self, max_size, get_size=lambda value: 1):
+        self.max_size = max_size
+        self.get_size = get_size
+        self.size = 0
+        self._items = OrderedDict()
+        self._lock = threading.RLock()
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._items
+
+    def __len__(self):
+        with self._lock:
+            return len(self._items)
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._items:
+                return default
+            self._items.move_to_end(key)
+            return self._items[key][0]
+
+    def put(self, key, value, size=None):
+        # size overrides get_size, e.g. 0 for a value already counted elsewhere
+        size = self.get_size(value) if size is None else size
+        with self._lock:
+            self.pop(key)
+            if size > self.max_size:
+                return
+            self._items[key] = (value, size)
+            self.size += size
+            while self.size > self.max_size:
+                self.pop(next(iter(self._items)))
+
+    def pop(self, key, default=None):
+        with self._lock:
+            if key not in self._items:
+                return default
+            value, size = self._items.pop(key)
+            self.size -= size
+            return value
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self.size = 0
+
+
+def touch(path):
+    try:
+        os.utime(path, None)
+    except OSError:
+        pass
+
+
+def write_atomic(path, write):
+    # other sessions may read the same key, so never expose a half-written file
+    tmp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def get_directory_entries(path):
+    entries = []
+    if os.path.isdir(path):
+        for entry in os.scandir(path):
+            if entry.is_file():
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+    return sorted(entries)
+
+
+def get_directory_groups(path):
+    # A key's files (data and metadata, e.g. key.arrow and key.pkl) are one
+    # group: used when any of them was last touched, evicted together
+    groups = {}
+    for mtime, size, file_path in get_directory_entries(path):
+        key = os.path.basename(file_path).split('.')[0]
+        group = groups.setdefault(key, [0.0, []])
+        group[0] = max(group[0], mtime)
+        group[1].append((size, file_path))
+    return sorted((mtime, key, files) for key, (mtime, files) in groups.items())
+
+
+def evict_directory(path, max_bytes, keep=()):
+    # files are touched on every read, so the oldest group is the least
+    # recently used; temporary files being written are counted, never removed
+    groups = get_directory_groups(path)
+    total = sum(size for _, _, files in groups for size, _ in files)
+    for _, key, files in groups:
+        if total <= max_bytes:
+            break
+        if key in keep:
+            continue
+        for size, file_path in files:
+            if file_path.endswith('.tmp'):
+                continue
+            try:
+                os.remove(file_path)
+                total -= size
+            except OSError:
+                pass
+    return total
@@ -1,3 +1,15 @@
+import pandas as pd
+
+
 def find_index_from_list(columns, match):
     matches = [i for i, col in enumerate(columns) if match in col]
-    return matches[0] if len(matches) else -1
\ No newline at end of file
+    return matches[0] if len(matches) else -1
+
+
+def is_sparse_dtype(dtype):
+    return isinstance(dtype, pd.SparseDtype)
+
+
+def to_dense_frame(df):
+    sparse_columns = {col: df[col].dtype.subtype for col in df.columns if is_sparse_dtype(df[col].dtype)}
+    return df.astype(sparse_columns) if sparse_columns else df
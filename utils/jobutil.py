@@ -0,0 +1,231 @@
+import os
+import json
+import time
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+import cacheutil
+import profileutil
+
+JOB_TABLE_PATH = os.environ.get('ACTIVEML_JOB_TABLE', os.path.join(os.path.expanduser('~'), '.activeml', 'jobs.json'))
+JOB_MAX_WORKERS = int(os.environ.get('ACTIVEML_JOB_WORKERS', 2))
+JOB_SHORT_MAX_WORKERS = int(os.environ.get('ACTIVEML_SHORT_JOB_WORKERS', 4))
+JOB_HISTORY = 100
+# finished results nobody has taken yet, e.g. the session went away
+JOB_MAX_UNCONSUMED = 8
+JOB_POLL_SECONDS = 0.25
+
+STATUS_QUEUED = 'queued'
+STATUS_RUNNING = 'running'
+STATUS_DONE = 'done'
+STATUS_FAILED = 'failed'
+STATUS_INTERRUPTED = 'interrupted'
+ACTIVE_STATUSES = [STATUS_QUEUED, STATUS_RUNNING]
+
+# model fits can take minutes, statistics seconds; each has its own pool so
+# a view's statistics never wait behind other users' training
+POOL_LONG = 'long'
+POOL_SHORT = 'short'
+POOL_MAX_WORKERS = {POOL_LONG: JOB_MAX_WORKERS, POOL_SHORT: JOB_SHORT_MAX_WORKERS}
+
+_local = threading.local()
+_lock = threading.RLock()
+_executors = {}
+
+
+class Job:
+    # One run of func(*args, **kwargs) on the job pool. The result stays on the
+    # future until a rerun takes it (the caller keeps it, see viewutil.run_job),
+    # so a session that reruns, or another session asking for the same key,
+    # attaches to a running job instead of starting another. A failure stays on
+    # the job until retry() is called.
+    def __init__(self, key, name, record=None):
+        self.key = key
+        self.name = name
+        self.status = STATUS_QUEUED
+        self.progress = None
+        self.message = None
+        self.error = None
+        self.requests = 1
+        self.submitted = time.time()
+        self.started = None
+        self.finished = None
+        self.future = None
+        self.stages = None
+        if record is not None:
+            self.__dict__.update(record)
+
+    def run(self, func, args, kwargs):
+        # the job thread has a profile of its own, its stages are handed to the
+        # rerun that waits for the result
+        _local.job = self
+        self.update(STATUS_RUNNING, started=time.time())
+        profileutil.start_rerun(session_id='job:' + self.name)
+        try:
+            with profileutil.stage('job ' + self.name):
+                result = func(*args, **kwargs)
+        except BaseException as e:
+            self.update(STATUS_FAILED, finished=time.time(), error=str(e))
+            raise
+        finally:
+            self.stages = profileutil.finish_rerun()['stages']
+            _local.job = None
+        self.update(STATUS_DONE, finished=time.time(), progress=1.0)
+        return result
+
+    def update(self, status, **fields):
+        with _lock:
+            self.status = status
+            self.__dict__.update(fields)
+        save_table()
+
+    def get_elapsed(self):
+        start = self.started or self.submitted
+        return (self.finished or time.time()) - start
+
+    def get_status_text(self):
+        text = f'{self.name}: {self.status}'
+        if self.progress is not None and self.status == STATUS_RUNNING:
+            text += f' {self.progress:.0%}'
+        if self.message:
+            text += f', {self.message}'
+        return text + f' ({self.get_elapsed():.1f}s)'
+
+    def to_record(self):
+        return {field: getattr(self, field) for field in ['key', 'name', 'status', 'progress', 'message', 'error',
+            'requests', 'submitted', 'started', 'finished']}
+
+
+def load_table(path=JOB_TABLE_PATH):
+    # jobs that were queued or running when the last server process stopped
+    # cannot finish any more, they are listed as interrupted
+    try:
+        with open(path) as f:
+            records = json.load(f)
+    except (OSError, ValueError):
+        records = []
+    table = OrderedDict()
+    for record in records:
+        job = Job(record['key'], record['name'], record)
+        if job.status in ACTIVE_STATUSES:
+            job.status = STATUS_INTERRUPTED
+        table[job.key] = job
+    return table
+
+
+jobs = load_table()
+
+
+def save_table(path=JOB_TABLE_PATH):
+    with _lock:
+        records = [job.to_record() for job in jobs.values()]
+
+    def write(tmp_path):
+        with open(tmp_path, 'w') as f:
+            json.dump(records, f)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        cacheutil.write_atomic(path, write)
+    except OSError:
+        pass
+
+
+def get_executor(pool=POOL_LONG):
+    # pools of their own, so long jobs never hold up the plot and parsing pools
+    with _lock:
+        executor = _executors.get(pool)
+        if executor is None:
+            executor = _executors[pool] = ThreadPoolExecutor(max_workers=POOL_MAX_WORKERS[pool],
+                thread_name_prefix=f'job-{pool}')
+        return executor
+
+
+def trim_table():
+    finished = [key for key, job in jobs.items() if job.status not in ACTIVE_STATUSES]
+    for key in finished[:max(len(jobs) - JOB_HISTORY, 0)]:
+        del jobs[key]
+    unconsumed = [job for job in jobs.values() if job.status == STATUS_DONE and job.future is not None]
+    for job in unconsumed[:max(len(unconsumed) - JOB_MAX_UNCONSUMED, 0)]:
+        job.future = None
+
+
+def submit(key, name, func, *args, pool=POOL_LONG, **kwargs):
+    # identical requests, from reruns or other sessions, share one job
+    with _lock:
+        job = jobs.get(key)
+        # failed jobs are kept until retried; taken results, and interrupted
+        # jobs, have no future to attach to
+        if job is not None and (job.future is not None or job.status == STATUS_FAILED):
+            job.requests += 1
+            jobs.move_to_end(key)
+            return job
+        job = jobs[key] = Job(key, name)
+        jobs.move_to_end(key)
+        trim_table()
+        job.future = get_executor(pool).submit(job.run, func, args, kwargs)
+    save_table()
+    return job
+
+
+def wait(job, element, poll=JOB_POLL_SECONDS):
+    # Only the waiting happens on the script thread: a rerun interrupts the
+    # element update, not the job, and the next run attaches to it again
+    future = job.future
+    if future is None:
+        raise RuntimeError(f'{job.name} failed: {job.error}')
+    try:
+        while True:
+            try:
+                result = future.result(timeout=poll)
+                break
+            except TimeoutError:
+                element.text(job.get_status_text())
+    finally:
+        element.empty()
+        if future.done():
+            record_stages(job)
+    # the result is the caller's now, the table only keeps the record
+    with _lock:
+        if job.future is future:
+            job.future = None
+    return result
+
+
+def record_stages(job):
+    # the first rerun to get the outcome records the job's stages, once
+    with _lock:
+        stages, job.stages = job.stages, None
+    profileutil.record_stages(stages or [])
+
+
+def run(key, name, element, func, *args, pool=POOL_LONG, **kwargs):
+    return wait(submit(key, name, func, *args, pool=pool, **kwargs), element)
+
+
+def is_failed(key):
+    job = jobs.get(key)
+    return job is not None and job.status == STATUS_FAILED
+
+
+def retry(key):
+    # the next submit for the key starts a new job
+    with _lock:
+        if is_failed(key):
+            del jobs[key]
+
+
+def report(progress, message=None):
+    # called from inside a job function; a no-op anywhere else
+    job = getattr(_local, 'job', None)
+    if job is not None:
+        job.progress = progress
+        job.message = message
+
+
+def get_table():
+    with _lock:
+        records = [job.to_record() for job in reversed(jobs.values())]
+    for record in records:
+        record['elapsed'] = ((record['finished'] or time.time()) - (record['started'] or record['submitted']))
+    return records
@@ -1,11 +1,199 @@
+import numpy as np
+import pandas as pd
 import pydeck as pdk
 
+import cacheutil
+
 MAPBOX_STYLES = ['light-v10', 'dark-v10', 'streets-v11', 'satellite-v9', 'satellite-streets-v11']
 
+BINNING_HEXAGON = 'Hexagon'
+BINNING_GRID = 'Grid'
+BINNING_CLIENT = 'Hexagon (in browser)'
+BINNING_TYPES = [BINNING_HEXAGON, BINNING_GRID, BINNING_CLIENT]
+
+EARTH_RADIUS = 6371008.8
+METERS_PER_PIXEL = 156543.03392
+MIN_BIN_PIXELS = 4
+ELEVATION_RANGE = [0, 1000]
+# deck.gl's default colorRange for the aggregation layers
+COLOR_RANGE = [[1, 152, 189], [73, 227, 206], [216, 254, 181], [254, 237, 177], [254, 173, 84], [209, 55, 78]]
+BIN_CACHE_MAX_BYTES = 64 << 20
+MAP_CACHE_MAX_BYTES = 256 << 20
+VIEW_QUANTILES = [0.01, 0.99]
+VIEW_WIDTH = 700
+VIEW_HEIGHT = 500
+TILE_SIZE = 256
+DEFAULT_ZOOM = 11
+
+bin_cache = cacheutil.LRUCache(BIN_CACHE_MAX_BYTES, cacheutil.get_frame_size)
+map_cache = cacheutil.LRUCache(MAP_CACHE_MAX_BYTES, lambda entry: cacheutil.get_frame_size(entry[0]))
+
 def get_mapbox_styles():
     return MAPBOX_STYLES
 
-def get_mapbox_map(data, lat_col, lon_col, lat, lon, zoom=11, pitch=50, radius=100, style=MAPBOX_STYLES[0]):
+def get_binning_types():
+    return BINNING_TYPES
+
+def to_float(series):
+    if pd.api.types.is_numeric_dtype(series.dtype):
+        return series.to_numpy(dtype=np.float64)
+    return pd.to_numeric(series, errors='coerce').to_numpy(dtype=np.float64)
+
+def get_view_state(lat, lon):
+    # quantiles keep a few stray points from zooming the view out to the world
+    if not len(lat):
+        return 0.0, 0.0, 1
+    (lat_low, lat_high), (lon_low, lon_high) = np.quantile(np.vstack([lat, lon]), VIEW_QUANTILES, axis=1).T
+    center_lat, center_lon = (lat_low + lat_high) / 2, (lon_low + lon_high) / 2
+    lon_span = np.radians(lon_high - lon_low)
+    y_span = abs(np.log(np.tan(np.pi / 4 + np.radians(lat_high) / 2)) - np.log(np.tan(np.pi / 4 + np.radians(lat_low) / 2)))
+    zooms = [np.log2(size * 2 * np.pi / (TILE_SIZE * span)) for size, span in [(VIEW_WIDTH, lon_span), (VIEW_HEIGHT, y_span)] if span > 0]
+    zoom = int(np.clip(np.floor(min(zooms)), 1, 20)) if len(zooms) else DEFAULT_ZOOM
+    return center_lat, center_lon, zoom
+
+def get_map_data(df, lat_col, lon_col, weight_col=None):
+    # only the plotted columns are kept, and rows without a valid coordinate
+    # (or weight) are dropped before anything is binned or serialized
+    key = cacheutil.get_hash(cacheutil.get_frame_hash(df), lat_col, lon_col, weight_col)
+    entry = map_cache.get(key)
+    if entry is None:
+        columns = {'lat': to_float(df[lat_col]), 'lon': to_float(df[lon_col])}
+        if weight_col:
+            columns['weight'] = to_float(df[weight_col])
+        with np.errstate(invalid='ignore'):
+            valid = (np.abs(columns['lat']) <= 90) & (np.abs(columns['lon']) <= 180)
+        if weight_col:
+            valid &= np.isfinite(columns['weight'])
+        data = pd.DataFrame({name: values[valid] for name, values in columns.items()})
+        entry = (data, get_view_state(data['lat'].to_numpy(), data['lon'].to_numpy()))
+        map_cache.put(key, entry)
+    return entry
+
+def get_bin_size(radius, lat, zoom):
+    # bins narrower than a few screen pixels at this zoom only add payload
+    pixel = METERS_PER_PIXEL * np.cos(np.radians(lat)) / 2 ** zoom
+    return max(float(radius), pixel * MIN_BIN_PIXELS)
+
+def project(lat, lon, lat0, lon0):
+    # equirectangular around the view center, close enough at map-view extents
+    x = np.radians(lon - lon0) * np.cos(np.radians(lat0)) * EARTH_RADIUS
+    y = np.radians(lat - lat0) * EARTH_RADIUS
+    return x, y
+
+def unproject(x, y, lat0, lon0):
+    lat = lat0 + np.degrees(y / EARTH_RADIUS)
+    lon = lon0 + np.degrees(x / (EARTH_RADIUS * np.cos(np.radians(lat0))))
+    return lat, lon
+
+def get_hexagon_cells(x, y, size):
+    # flat-top axial coordinates with cube rounding, the orientation of a
+    # six-sided ColumnLayer disk
+    q = 2 / 3 * x / size
+    r = (-x / 3 + np.sqrt(3) / 3 * y) / size
+    s = -q - r
+    rq, rr, rs = np.round(q), np.round(r), np.round(s)
+    dq, dr, ds = np.abs(rq - q), np.abs(rr - r), np.abs(rs - s)
+    fix_q = (dq > dr) & (dq > ds)
+    fix_r = ~fix_q & (dr > ds)
+    rq = np.where(fix_q, -rr - rs, rq)
+    rr = np.where(fix_r, -rq - rs, rr)
+    return rq.astype(np.int64), rr.astype(np.int64)
+
+def get_hexagon_centers(q, r, size):
+    return size * 1.5 * q, size * np.sqrt(3) * (r + q / 2)
+
+def get_grid_cells(x, y, size):
+    return np.floor(x / size).astype(np.int64), np.floor(y / size).astype(np.int64)
+
+def get_grid_centers(i, j, size):
+    return (i + 0.5) * size, (j + 0.5) * size
+
+def bin_points(lat, lon, size, binning=BINNING_HEXAGON, weights=None, center=None):
+    lat = np.asarray(lat, dtype=np.float64)
+    lon = np.asarray(lon, dtype=np.float64)
+    valid = np.isfinite(lat) & np.isfinite(lon)
+    if not valid.all():
+        lat, lon = lat[valid], lon[valid]
+        weights = np.asarray(weights)[valid] if weights is not None else None
+    lat0, lon0 = center if center is not None else (np.mean(lat), np.mean(lon))
+    x, y = project(lat, lon, lat0, lon0)
+    if binning == BINNING_GRID:
+        a, b = get_grid_cells(x, y, size)
+    else:
+        a, b = get_hexagon_cells(x, y, size)
+    if not len(a):
+        return pd.DataFrame({'lat': [], 'lon': [], 'count': []})
+
+    # one sort over a packed cell id, then a weighted bincount per cell
+    a_min, b_min = a.min(), b.min()
+    width = b.max() - b_min + 1
+    cells, inverse = np.unique((a - a_min) * width + (b - b_min), return_inverse=True)
+    counts = np.bincount(inverse, weights=weights, minlength=len(cells))
+    a, b = cells // width + a_min, cells % width + b_min
+
+    if binning == BINNING_GRID:
+        cx, cy = get_grid_centers(a, b, size)
+    else:
+        cx, cy = get_hexagon_centers(a, b, size)
+    cell_lat, cell_lon = unproject(cx, cy, lat0, lon0)
+    return pd.DataFrame({'lat': cell_lat, 'lon': cell_lon, 'count': counts})
+
+def style_bins(bins):
+    counts = bins['count'].to_numpy(dtype=np.float64)
+    low, high = (counts.min(), counts.max()) if len(counts) else (0.0, 0.0)
+    scale = (counts - low) / (high - low) if high > low else np.zeros(len(counts))
+    levels = np.minimum((scale * len(COLOR_RANGE)).astype(np.int64), len(COLOR_RANGE) - 1)
+    colors = np.asarray(COLOR_RANGE)[levels].tolist()
+    elevation = ELEVATION_RANGE[0] + counts / high * (ELEVATION_RANGE[1] - ELEVATION_RANGE[0]) if high > 0 else counts
+    return bins.assign(elevation=elevation, color=colors)
+
+def get_bins(data, lat_col, lon_col, size, binning, center, weight_col=None):
+    key = cacheutil.get_hash(cacheutil.get_frame_hash(data), lat_col, lon_col, size, binning, center, weight_col)
+    bins = bin_cache.get(key)
+    if bins is None:
+        weights = data[weight_col].to_numpy(dtype=np.float64) if weight_col else None
+        bins = style_bins(bin_points(data[lat_col], data[lon_col], size, binning, weights, center))
+        bin_cache.put(key, bins)
+    return bins
+
+def get_bin_layer(bins, size, binning, pitch):
+    # only the aggregated cells are serialized, so the payload follows the
+    # number of bins rather than the number of rows
+    hexagon = binning != BINNING_GRID
+    return pdk.Layer(
+        "ColumnLayer",
+        data=bins,
+        get_position=['lon', 'lat'],
+        get_elevation='elevation',
+        get_fill_color='color',
+        radius=size if hexagon else size / np.sqrt(2),
+        disk_resolution=6 if hexagon else 4,
+        angle=0 if hexagon else 45,
+        elevation_scale=4 if pitch > 0 else 0,
+        pickable=True,
+        extruded=True,
+    )
+
+def get_mapbox_map(data, lat_col, lon_col, lat, lon, zoom=11, pitch=50, radius=100, style=MAPBOX_STYLES[0], binning=BINNING_CLIENT, weight_col=None):
+    if binning == BINNING_CLIENT:
+        weight_kwargs = {'get_elevation_weight': weight_col, 'get_color_weight': weight_col,
+            'elevation_aggregation': 'SUM', 'color_aggregation': 'SUM'} if weight_col else {}
+        layer = pdk.Layer(
+            "HexagonLayer",
+            data=data,
+            get_position=[lon_col, lat_col],
+            **weight_kwargs,
+            radius=radius,
+            elevation_scale=4 if pitch > 0 else 0,
+            elevation_range=ELEVATION_RANGE,
+            pickable=True,
+            extruded=True,
+        )
+    else:
+        # streamlit reruns on every zoom or radius change, which re-bins at the new size
+        size = get_bin_size(radius, lat, zoom)
+        layer = get_bin_layer(get_bins(data, lat_col, lon_col, size, binning, (lat, lon), weight_col), size, binning, pitch)
+
     return pdk.Deck(
         map_style="mapbox://styles/mapbox/" + style,
         initial_view_state={
@@ -14,16 +202,5 @@ def get_mapbox_map(data, lat_col, lon_col, lat, lon, zoom=11, pitch=50, radius=1
             "zoom": zoom,
             "pitch": pitch,
         },
-        layers=[
-            pdk.Layer(
-                "HexagonLayer",
-                data=data,
-                get_position=[lon_col, lat_col],
-                radius=radius,
-                elevation_scale=4 if pitch > 0 else 0,
-                elevation_range=[0, 1000],
-                pickable=True,
-                extruded=True,
-            ),
-        ]
-    )
\ No newline at end of file
+        layers=[layer]
+    )
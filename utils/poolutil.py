@@ -0,0 +1,82 @@
+import os
+import threading
+import importlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+POOL_MAX_WORKERS = int(os.environ.get('ACTIVEML_MAX_WORKERS', os.cpu_count() or 1))
+
+WARM_START = os.environ.get('ACTIVEML_WARM_START', '1') == '1'
+# forking the threaded server can copy locks held by other threads into the
+# child, so workers come from a fork server (or are spawned where there is none)
+POOL_START_METHOD = os.environ.get('ACTIVEML_POOL_START_METHOD',
+    'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn')
+
+_pools = {}
+_lock = threading.Lock()
+_warmed = False
+
+
+def get_pool(use_processes=False, max_workers=None):
+    # pools are process-wide so every session and rerun reuses the same workers
+    key = (use_processes, max_workers or POOL_MAX_WORKERS)
+    with _lock:
+        pool = _pools.get(key)
+        if pool is None:
+            if use_processes:
+                pool = ProcessPoolExecutor(max_workers=key[1], mp_context=multiprocessing.get_context(POOL_START_METHOD))
+            else:
+                pool = ThreadPoolExecutor(max_workers=key[1])
+            _pools[key] = pool
+        return pool
+
+
+def reset_pool(use_processes=False, max_workers=None):
+    key = (use_processes, max_workers or POOL_MAX_WORKERS)
+    with _lock:
+        pool = _pools.pop(key, None)
+    if pool is not None:
+        pool.shutdown(wait=False)
+
+
+def map_parallel(func, items, use_processes=False, max_workers=None):
+    items = list(items)
+    if len(items) < 2 or (max_workers or POOL_MAX_WORKERS) < 2:
+        return [func(*item) for item in items]
+    pool = get_pool(use_processes, max_workers)
+    try:
+        return list(pool.map(func, *zip(*items)))
+    except BrokenProcessPool:
+        # a worker died (e.g. killed for memory), start over serially with a fresh pool next time
+        reset_pool(use_processes, max_workers)
+        return [func(*item) for item in items]
+
+
+def import_modules(names):
+    for name in names:
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            pass
+    return os.getpid()
+
+
+def warm_up(names, worker_names=()):
+    # Once per process, after the first page is served: import the heavy modules
+    # on a background thread, then start the process workers and have each
+    # import the plotting stack, instead of paying for it on a first click
+    global _warmed
+    with _lock:
+        if _warmed or not WARM_START:
+            return
+        _warmed = True
+
+    def run():
+        import_modules(names)
+        if worker_names:
+            pool = get_pool(use_processes=True)
+            for _ in range(POOL_MAX_WORKERS):
+                pool.submit(import_modules, worker_names)
+
+    threading.Thread(target=run, name='warm-up', daemon=True).start()
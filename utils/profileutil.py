@@ -0,0 +1,180 @@
+import io
+import os
+import sys
+import json
+import time
+import pstats
+import cProfile
+import logging
+import importlib
+import tempfile
+import functools
+import threading
+import tracemalloc
+import contextlib
+
+PROFILE_LOG_PATH = os.environ.get('ACTIVEML_PROFILE_LOG')
+PROFILE_TOP_FUNCTIONS = 30
+
+logger = logging.getLogger('activeml.performance')
+if PROFILE_LOG_PATH:
+    handler = logging.FileHandler(PROFILE_LOG_PATH)
+    handler.setFormatter(logging.Formatter('%(message)s'))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+
+_local = threading.local()
+_lock = threading.Lock()
+_tracing = 0
+
+
+class RerunProfile:
+    # Stages of one script run on one session thread. Same-named stages (e.g.
+    # every st_plot) are summed; CPU is this thread's, other sessions' script
+    # and job threads are not counted. tracemalloc is process wide: it runs while
+    # any rerun traces memory and is stopped after the last one finishes, never
+    # reset in between, so sessions cannot clobber each other.
+    # Stages get the net change of traced memory (allocations of other
+    # threads running meanwhile included), the rerun the process-wide peak.
+    def __init__(self, session_id=None, trace_memory=False, capture=False):
+        self.session_id = session_id
+        self.trace_memory = trace_memory
+        self.stages = {}
+        self.order = []
+        self.start_wall = time.perf_counter()
+        self.start_cpu = time.thread_time()
+        self.profiler = cProfile.Profile() if capture else None
+        self.stats = None
+
+    def start(self):
+        if self.trace_memory:
+            start_tracing()
+        if self.profiler is not None:
+            self.profiler.enable()
+        return self
+
+    def record(self, name, wall, cpu, net_bytes, calls=1):
+        if name not in self.stages:
+            self.stages[name] = {'stage': name, 'calls': 0, 'wall': 0.0, 'cpu': 0.0, 'net_bytes': None}
+            self.order.append(name)
+        entry = self.stages[name]
+        entry['calls'] += calls
+        entry['wall'] += wall
+        entry['cpu'] += cpu
+        if net_bytes is not None:
+            entry['net_bytes'] = (entry['net_bytes'] or 0) + net_bytes
+
+    def finish(self):
+        if self.profiler is not None:
+            self.profiler.disable()
+            self.stats = pstats.Stats(self.profiler)
+        tracing = self.trace_memory and tracemalloc.is_tracing()
+        peak_bytes = tracemalloc.get_traced_memory()[1] if tracing else None
+        if self.trace_memory:
+            stop_tracing()
+        result = {
+            'session': self.session_id,
+            'time': time.time(),
+            'wall': time.perf_counter() - self.start_wall,
+            'cpu': time.thread_time() - self.start_cpu,
+            'process_peak_bytes': peak_bytes,
+            'stages': self.get_stages(),
+        }
+        logger.info(json.dumps(result))
+        return result
+
+    def get_stages(self):
+        return [self.stages[name] for name in self.order]
+
+    def get_profile_text(self, n=PROFILE_TOP_FUNCTIONS):
+        output = io.StringIO()
+        pstats.Stats(self.profiler, stream=output).sort_stats('cumulative').print_stats(n)
+        return output.getvalue()
+
+    def get_profile_data(self):
+        # marshalled pstats, loadable with pstats.Stats or snakeviz
+        fd, path = tempfile.mkstemp(suffix='.prof')
+        os.close(fd)
+        try:
+            self.stats.dump_stats(path)
+            with open(path, 'rb') as f:
+                return f.read()
+        finally:
+            os.remove(path)
+
+
+def start_tracing():
+    global _tracing
+    with _lock:
+        _tracing += 1
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+
+def stop_tracing():
+    # tracing slows every allocation in the server, stop it with the last user
+    global _tracing
+    with _lock:
+        _tracing -= 1
+        if _tracing == 0 and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+
+def start_rerun(session_id=None, trace_memory=False, capture=False):
+    _local.profile = RerunProfile(session_id, trace_memory, capture).start()
+    return _local.profile
+
+
+def finish_rerun():
+    profile = getattr(_local, 'profile', None)
+    _local.profile = None
+    return profile.finish() if profile is not None else None
+
+
+def record_stages(stages):
+    # stages measured on another thread (see jobutil) into this thread's rerun
+    profile = getattr(_local, 'profile', None)
+    if profile is None:
+        return
+    for entry in stages:
+        profile.record(entry['stage'], entry['wall'], entry['cpu'], entry['net_bytes'], entry['calls'])
+
+
+def timed(name):
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+@contextlib.contextmanager
+def stage(name):
+    # no-op outside an instrumented rerun, e.g. in worker threads or headless use
+    profile = getattr(_local, 'profile', None)
+    if profile is None:
+        yield
+        return
+
+    tracing = profile.trace_memory and tracemalloc.is_tracing()
+    current = tracemalloc.get_traced_memory()[0] if tracing else None
+    start_wall = time.perf_counter()
+    start_cpu = time.thread_time()
+    try:
+        yield
+    finally:
+        wall = time.perf_counter() - start_wall
+        cpu = time.thread_time() - start_cpu
+        net_bytes = tracemalloc.get_traced_memory()[0] - current if tracing else None
+        profile.record(name, wall, cpu, net_bytes)
+
+
+def lazy_import(name):
+    # heavy view modules are imported on first use, and that first import is
+    # recorded as its own stage; later calls are a sys.modules lookup
+    if name in sys.modules:
+        return importlib.import_module(name)
+    with stage('import ' + name):
+        return importlib.import_module(name)
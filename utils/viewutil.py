@@ -1,24 +1,87 @@
+import io
+import os
+import base64
 import streamlit as st
 
+import cacheutil
+import commonutil
+import profileutil
+import jobutil
+
+FIGURE_CACHE_MAX_BYTES = int(os.environ.get('ACTIVEML_FIGURE_CACHE_MAX_BYTES', 256 << 20))
+VIEW_CACHE_MAX_BYTES = int(os.environ.get('ACTIVEML_VIEW_CACHE_MAX_BYTES', 256 << 20))
+
+LABEL_RETRY_JOB = 'Retry'
+
+figure_cache = cacheutil.LRUCache(FIGURE_CACHE_MAX_BYTES, len)
+view_cache = cacheutil.LRUCache(VIEW_CACHE_MAX_BYTES, cacheutil.get_object_size)
+
 def section_title(text):
     st.markdown(f'*{text}*')
 
-def view_data(df, checkbox_key=None):
+def view_data(df, checkbox_key=None, shape=None):
     if df is not None:
         section_title('Shape')
-        st.write(df.shape)
+        st.write(shape if shape is not None else df.shape)
 
         section_title('Head')
-        st.write(df[:5])
+        st.write(commonutil.to_dense_frame(df[:5]))
 
         if st.checkbox("View All", key=checkbox_key):
-            st.write(df)
+            st.write(commonutil.to_dense_frame(df))
+
+def get_plot_key(df, plot_type, *args):
+    return cacheutil.get_hash(cacheutil.get_frame_hash(df), plot_type, *args)
+
+def get_view_key(df, view, *args):
+    return cacheutil.get_hash(cacheutil.get_frame_hash(df), view, *args)
 
-def st_plot(plot):
+def memoize(compute, cache_key):
+    # a view's tables depend only on the processed frame and the view's own
+    # widgets, both part of the key, so other interactions reuse them
+    value = view_cache.get(cache_key)
+    if value is None:
+        value = compute()
+        view_cache.put(cache_key, value)
+    return value
+
+def run_job(cache_key, name, func, *args, pool=jobutil.POOL_LONG, **kwargs):
+    # results of background jobs live in the view cache, which is bounded in
+    # bytes; a failed job is shown as failed until the user retries it
+    if jobutil.is_failed(cache_key) and st.button(f'{LABEL_RETRY_JOB} {name}', key=f'retry_{cache_key}'):
+        jobutil.retry(cache_key)
+    return memoize(lambda: jobutil.run(cache_key, name, st.empty(), func, *args, pool=pool, **kwargs), cache_key)
+
+def render_figure(fig):
+    # same output st.pyplot would produce
+    image = io.BytesIO()
+    fig.savefig(image, bbox_inches='tight', dpi=200, format='png')
+    fig.clf()
+    return image.getvalue()
+
+def st_plot(plot, cache_key=None):
+    # plot is an Axes or a callable returning one; with a cache key the
+    # callable only runs when the rendered image is not cached yet
     try:
-        st.pyplot(plot.get_figure(), clear_figure=True)
+        if cache_key is None:
+            with profileutil.stage('st_plot'):
+                plot = plot() if callable(plot) else plot
+                st.pyplot(plot.get_figure(), clear_figure=True)
+            return
+
+        image = figure_cache.get(cache_key)
+        if image is None:
+            with profileutil.stage('st_plot'):
+                plot = plot() if callable(plot) else plot
+                image = render_figure(plot.get_figure())
+            figure_cache.put(cache_key, image)
+        st.image(image, use_column_width=True, output_format='PNG')
     except Exception as e:
         st.error(e)
 
+def st_download_link(data, file_name, label):
+    data = base64.b64encode(data).decode()
+    st.markdown(f'<a href="data:application/octet-stream;base64,{data}" download="{file_name}">{label}</a>', unsafe_allow_html=True)
+
 def st_round(x, precision=3):
     st.write(round(x, precision))
\ No newline at end of file